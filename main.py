@@ -10,15 +10,21 @@ Responsibilities:
 
 import json
 import os
+import shutil
 import sys
-from datetime import datetime
+from datetime import datetime, timedelta
 from planner.utils.logger import setup_logger
+from planner.utils.versions import VersionAllocator
+from planner.utils.plan_store import PlanStore
+from planner.utils.progress import report
 from dotenv import load_dotenv
 from planner.models.syllabus import Subject, Unit, Topic
-from planner.engine.planner_engine import PlannerEngine
-from planner.writers.excel_writer import ExcelWriter
+from planner.engine.planner_engine import PlannerEngine, overflow_summary, scheduling_mode
+from planner.engine.batch import CohortPlanner
+from planner.writers.formats import parse_formats, write_outputs
 from planner.ingestion.ocr import OCREngine
 from planner.ingestion.cleaner import SyllabusCleaner
+from planner.ingestion.cache import IngestionCache
 from planner.ai.extractor import Syllabusextractor
 from planner.ai.validator import SyllabusValidator
 from planner.agent.dialogue import DialogueAgent
@@ -28,30 +34,44 @@ logger = setup_logger(__name__)
 # Load environment variables
 load_dotenv()
 
-def get_next_version_dir(base_dir="output"):
-    """Returns the path for the next version directory, e.g., output/v1, output/v2."""
-    if not os.path.exists(base_dir):
-        os.makedirs(base_dir)
-        return os.path.join(base_dir, "v1")
-    
-    versions = [d for d in os.listdir(base_dir) if d.startswith('v') and d[1:].isdigit()]
-    if not versions:
-        return os.path.join(base_dir, "v1")
-    
-    next_ver = max([int(v[1:]) for v in versions]) + 1
-    return os.path.join(base_dir, f"v{next_ver}")
+REFINED_JSON = "syllabus_refined.json"
+# Hours that didn't fit their week (capacity scheduling); empty in count mode
+OVERFLOW_JSON = "plan_overflow.json"
+
+def get_next_version_dir(base_dir=None):
+    """
+    Allocates and creates the next version directory, e.g., output/v1, output/v2.
+    Safe under concurrent runs. Call complete_version_dir() once its outputs are written.
+    """
+    return VersionAllocator(base_dir).allocate()
+
+def complete_version_dir(version_dir):
+    """
+    Marks a version as finished and prunes old finished versions per OUTPUT_KEEP_VERSIONS.
+    """
+    # Pruned versions may have been the last links to stored plans
+    allocator = VersionAllocator(os.path.dirname(version_dir), on_prune=lambda removed: PlanStore().gc())
+    allocator.complete(version_dir)
+
+def ingest_text(file_path: str, progress=None, ocr_workers=None) -> str:
+    """
+    Runs OCR and cleaning on a syllabus file (PDF/DOCX/Image) and returns the cleaned text.
+    CPU-bound; kept at module level so it can run in a worker process.
+    `ocr_workers` caps the OCR process pool (default: OCR_WORKERS / CPU count).
+    """
+    ocr = OCREngine(ocr_workers=ocr_workers, progress=progress)
+    cleaner = SyllabusCleaner(progress=progress)
+
+    logger.info(f"--- Processing: {file_path} ---")
+    raw_text, clean_text = IngestionCache().ingest(file_path, ocr, cleaner)
+    return clean_text
 
 def ingest_syllabus(file_path: str):
     """
     Ingests a syllabus file (PDF/DOCX/Image), cleans it, and extracts structured data.
     """
-    ocr = OCREngine()
-    cleaner = SyllabusCleaner()
+    clean_text = ingest_text(file_path)
     extractor = Syllabusextractor()
-
-    logger.info(f"--- Processing: {file_path} ---")
-    raw_text = ocr.extract_text(file_path)
-    clean_text = cleaner.clean(raw_text)
     
     logger.info("--- Extracting structured data via AI ---")
     syllabus_data = extractor.extract(clean_text)
@@ -77,13 +97,14 @@ def refine_syllabus_data(syllabus_data: dict):
 def load_subjects_from_dict(raw: dict):
     """Converts raw dict (from JSON or AI) into Subject objects."""
     # Use defaults if semester config is missing
-    semester_config = raw.get("semester", {
+    semester_config = raw.get("semester") or {
         "available_weeks": 15,
         "priority_focus": "IMP",
         "daily_hours": 3,
         "start_date": datetime.now().strftime("%Y-%m-%d"),
-        "end_date": (datetime.now().replace(month=datetime.now().month+4)).strftime("%Y-%m-%d")
-    })
+        # ~4 months; month+4 overflows past December
+        "end_date": (datetime.now() + timedelta(weeks=17)).strftime("%Y-%m-%d")
+    }
     
     # Merge preferences back into semester_config for the engine
     semester_config["difficulty_multiplier"] = raw.get("difficulty_multiplier", 1.0)
@@ -117,12 +138,163 @@ def load_subjects_from_dict(raw: dict):
 
     return subjects, semester_config
 
+def generate_outputs(refined_data: dict, progress=None, formats=None, scheduling=None):
+    """
+    Builds the plan for refined syllabus data and writes a new output version.
+    CPU-bound; kept at module level so it can run in a worker process.
+    `formats` selects the output files (see planner.writers.formats; default xlsx).
+    `scheduling` is "count" or "capacity" (see planner_engine.scheduling_mode).
+    Identical inputs reuse the stored artifacts instead of planning again (PLAN_DEDUP).
+    Returns (version_dir, {format: path}, overflow report).
+    """
+    formats = parse_formats(formats)
+    subjects, semester_config = load_subjects_from_dict(refined_data)
+    # Resolved before hashing, so the store key changes with the mode
+    semester_config["scheduling"] = scheduling_mode(semester_config, scheduling)
+
+    store = PlanStore()
+    if not store.enabled:
+        version_dir = get_next_version_dir()
+        _write_refined_json(refined_data, version_dir)
+        rows = _plan_rows(subjects, semester_config)
+        overflow = _write_overflow(rows, version_dir)
+        out_files = write_outputs(rows, version_dir, formats, progress=progress, subjects=subjects)
+        complete_version_dir(version_dir)
+        return version_dir, out_files, overflow
+
+    version_dir = get_next_version_dir()
+    key = store.key_for(refined_data, semester_config)
+    names = {fmt: f"semester_plan.{fmt}" for fmt in formats}
+    files = [REFINED_JSON, OVERFLOW_JSON, *names.values()]
+
+    def build(wanted, staging):
+        """Writes the wanted store files into staging; returns {name: path}."""
+        built = {}
+        if REFINED_JSON in wanted:
+            _write_refined_json(refined_data, staging)
+            built[REFINED_JSON] = os.path.join(staging, REFINED_JSON)
+        todo = [fmt for fmt in formats if names[fmt] in wanted]
+        if todo or OVERFLOW_JSON in wanted:
+            rows = _plan_rows(subjects, semester_config)
+            if OVERFLOW_JSON in wanted:
+                _write_overflow(rows, staging)
+                built[OVERFLOW_JSON] = os.path.join(staging, OVERFLOW_JSON)
+            written = write_outputs(rows, staging, todo, progress=progress, subjects=subjects) if todo else {}
+            built.update({names[fmt]: path for fmt, path in written.items()})
+        return built
+
+    # The version is a set of links into the store. Links are made under the store
+    # lock, which gc() also takes, so an entry can't be collected while we link it.
+    with store.locked():
+        missing = store.missing(key, files)
+        if not missing:
+            logger.info(f"--- Identical plan already generated ({key[:12]}), reusing it ---")
+            report(progress, "planning", message="Identical plan already generated, reusing it")
+            linked = store.link(key, files, version_dir)
+
+    if missing:
+        staging = store.staging_dir()
+        try:
+            # Plan and write outside the lock; it only guards the store's directories
+            built = build(missing, staging)
+            with store.locked():
+                store.add(key, built)
+                # Files we reused may have been collected since the first check;
+                # rebuilding them under the lock can't race with gc again
+                gone = store.missing(key, files)
+                if gone:
+                    store.add(key, build(gone, staging))
+                linked = store.link(key, files, version_dir)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    with open(linked[OVERFLOW_JSON]) as f:
+        overflow = json.load(f)
+    # Pruning (and the store gc it triggers) runs only after our links exist
+    complete_version_dir(version_dir)
+    return version_dir, {fmt: linked[name] for fmt, name in names.items()}, overflow
+
+def _plan_rows(subjects, semester_config):
+    logger.info(f"--- Generating study plan for {len(subjects)} subjects ---")
+    engine = PlannerEngine(subjects, semester_config)
+    return engine.generate_plan_with_time()
+
+def _write_refined_json(refined_data: dict, out_dir: str):
+    # Save the polished JSON for audit
+    with open(os.path.join(out_dir, REFINED_JSON), 'w') as f:
+        json.dump(refined_data, f, indent=2)
+
+def _write_overflow(rows, out_dir: str) -> dict:
+    overflow = overflow_summary(rows)
+    with open(os.path.join(out_dir, OVERFLOW_JSON), 'w') as f:
+        json.dump(overflow, f, indent=2)
+    # Returned as it reads back from JSON (week numbers become strings)
+    return json.loads(json.dumps(overflow))
+
+def run_cohort(path: str):
+    """
+    Plans every student of a cohort file: the usual syllabus JSON (semester + subjects)
+    plus a "students" list of per-student overrides.
+    """
+    with open(path) as f:
+        raw = json.load(f)
+
+    students = raw.get("students", [])
+    subjects, semester_config = load_subjects_from_dict(raw)
+
+    version_dir = get_next_version_dir()
+    cohort_dir = os.path.join(version_dir, "cohort")
+    summaries = CohortPlanner(subjects, semester_config).plan(students, output_dir=cohort_dir)
+    complete_version_dir(version_dir)
+
+    overflowing = sum(1 for s in summaries if s["overflow_hours"])
+    logger.info(f"\n[SUCCESS] Planned {len(summaries)} students into {cohort_dir} ({overflowing} over capacity)")
+
 def main():
     if len(sys.argv) < 2:
-        logger.info("Usage: python main.py <syllabus_file_or_json>")
+        logger.info("Usage: python main.py <syllabus_file_or_json> [--formats xlsx,csv,jsonl,ics] "
+                    "[--scheduling count|capacity]")
+        logger.info("       python main.py --cohort <cohort_json>")
         sys.exit(1)
 
-    path = sys.argv[1]
+    if sys.argv[1] == "--cohort":
+        if len(sys.argv) < 3 or not os.path.exists(sys.argv[2]):
+            logger.error("Error: --cohort needs an existing cohort JSON file")
+            sys.exit(1)
+        run_cohort(sys.argv[2])
+        return
+
+    args = sys.argv[1:]
+    formats = None
+    if "--formats" in args:
+        i = args.index("--formats")
+        if i + 1 >= len(args):
+            logger.error("Error: --formats needs a comma-separated list, e.g. xlsx,csv")
+            sys.exit(1)
+        try:
+            formats = parse_formats(args[i + 1])
+        except ValueError as e:
+            logger.error(f"Error: {e}")
+            sys.exit(1)
+        del args[i:i + 2]
+
+    scheduling = None
+    if "--scheduling" in args:
+        i = args.index("--scheduling")
+        if i + 1 >= len(args):
+            logger.error("Error: --scheduling needs a mode: count or capacity")
+            sys.exit(1)
+        try:
+            scheduling = scheduling_mode({}, args[i + 1])
+        except ValueError as e:
+            logger.error(f"Error: {e}")
+            sys.exit(1)
+        del args[i:i + 2]
+
+    if not args:
+        logger.error("Error: missing syllabus file")
+        sys.exit(1)
+    path = args[0]
     
     if not os.path.exists(path):
         logger.error(f"Error: File not found at {path}")
@@ -138,32 +310,12 @@ def main():
     # 2. Refinement (Validation + Dialogue)
     refined_data = refine_syllabus_data(raw_data)
     
-    # 3. Model Loading
-    subjects, semester_config = load_subjects_from_dict(refined_data)
-    
-    # 4. Plan Generation
-    logger.info(f"--- Generating study plan for {len(subjects)} subjects ---")
-    engine = PlannerEngine(subjects, semester_config)
-    rows = engine.generate_plan_with_time()
-    
-    # 5. Output with Versioning
-    version_dir = get_next_version_dir()
-    os.makedirs(version_dir, exist_ok=True)
-    
-    # Save the polished JSON for audit
-    with open(os.path.join(version_dir, "syllabus_refined.json"), 'w') as f:
-        json.dump(refined_data, f, indent=2)
-
-    writer = ExcelWriter()
-    for subject_name in set(r["subject"] for r in rows):
-        writer.write_subject_sheet(
-            subject_name,
-            [r for r in rows if r["subject"] == subject_name]
-        )
-
-    out_file = os.path.join(version_dir, "semester_plan.xlsx")
-    writer.save(out_file)
-    logger.info(f"\n[SUCCESS] Plan Version {os.path.basename(version_dir)} generated at: {out_file}")
+    # 3. Plan Generation + Output with Versioning
+    version_dir, out_files, overflow = generate_outputs(refined_data, formats=formats, scheduling=scheduling)
+    logger.info(f"\n[SUCCESS] Plan Version {os.path.basename(version_dir)} generated at: {', '.join(out_files.values())}")
+    if overflow["hours"]:
+        logger.warning(f"[!] {overflow['hours']}h of study don't fit their week (weeks {', '.join(overflow['weeks'])}); "
+                       f"see the Master sheet or {OVERFLOW_JSON}.")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,3 +1,4 @@
+from typing import Dict, Any, List
 from planner.utils.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -0,0 +1,173 @@
+"""
+LLM backends for syllabus extraction.
+
+Responsibilities:
+- Define the interface the client registry uses to talk to a model
+- GeminiBackend: Google Gemini through google.generativeai
+- FakeBackend: offline stand-in returning schema-valid JSON with configurable
+  latency and failure rates, for load tests and benchmarks without quota or network
+
+Select one with LLM_BACKEND (gemini / fake).
+"""
+
+import abc
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import google.generativeai as genai
+
+from planner.ai.rule_parser import RuleBasedParser
+from planner.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class LLMBackend(abc.ABC):
+    """
+    Interface for LLM backends. One instance per model name; instances are shared
+    across threads by the client registry.
+    """
+
+    # Whether configure() needs an API key
+    requires_api_key = True
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    @classmethod
+    def configure(cls, api_key: Optional[str]):
+        """Process-wide setup, run once before the first instance is created."""
+
+    @abc.abstractmethod
+    def generate_json(self, prompt: str) -> str:
+        """Returns the model's JSON response text. Errors carry an HTTP status in `.code` where known."""
+
+
+class GeminiBackend(LLMBackend):
+    """Gemini via the google.generativeai SDK."""
+
+    @classmethod
+    def configure(cls, api_key: Optional[str]):
+        genai.configure(api_key=api_key)
+
+    def __init__(self, model_name: str):
+        super().__init__(model_name)
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate_json(self, prompt: str) -> str:
+        # We explicitly allow the model to provide JSON
+        response = self.model.generate_content(
+            prompt,
+            generation_config=genai.GenerationConfig(
+                response_mime_type="application/json",
+            ),
+        )
+        if not response.text:
+            raise ValueError("Gemini returned an empty response.")
+        return response.text
+
+
+class FakeAPIError(Exception):
+    """Simulated API failure; `code` is read by the resilience layer like a real HTTP status."""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+class FakeBackend(LLMBackend):
+    """
+    Deterministic offline model. The response depends only on the syllabus text in
+    the prompt: the rule-based parse where it finds units, otherwise a synthetic
+    syllabus seeded by the text's hash. Latency and failures are drawn per call.
+    """
+
+    requires_api_key = False
+
+    _random = random.Random()
+    _random_lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, api_key: Optional[str]):
+        seed = os.environ.get("LLM_FAKE_SEED")
+        if seed is not None:
+            cls._random.seed(int(seed))
+
+    def __init__(self, model_name: str, latency_ms: Optional[float] = None, jitter_ms: Optional[float] = None,
+                 error_rate: Optional[float] = None, error_code: Optional[int] = None,
+                 missing_models: Optional[List[str]] = None):
+        super().__init__(model_name)
+        # Priority: argument -> environment -> default
+        self.latency = (latency_ms if latency_ms is not None else float(os.environ.get("LLM_FAKE_LATENCY_MS", 200))) / 1000
+        self.jitter = (jitter_ms if jitter_ms is not None else float(os.environ.get("LLM_FAKE_JITTER_MS", 50))) / 1000
+        self.error_rate = error_rate if error_rate is not None else float(os.environ.get("LLM_FAKE_ERROR_RATE", 0))
+        self.error_code = error_code or int(os.environ.get("LLM_FAKE_ERROR_CODE", 503))
+        if missing_models is None:
+            missing_models = [m.strip() for m in os.environ.get("LLM_FAKE_MISSING_MODELS", "").split(",") if m.strip()]
+        # Models that answer 404, to exercise the fallback chain
+        self.missing = model_name in missing_models
+
+    def generate_json(self, prompt: str) -> str:
+        with self._random_lock:
+            delay = max(0.0, self._random.uniform(self.latency - self.jitter, self.latency + self.jitter))
+            fails = self._random.random() < self.error_rate
+        time.sleep(delay)
+
+        if self.missing:
+            raise FakeAPIError(404, f"models/{self.model_name} is not found")
+        if fails:
+            raise FakeAPIError(self.error_code, "simulated API failure")
+        return json.dumps(self._syllabus(self._syllabus_text(prompt)))
+
+    @staticmethod
+    def _syllabus_text(prompt: str) -> str:
+        match = re.search(r'Syllabus Text:\s*---\n(.*?)\n\s*---', prompt, re.DOTALL)
+        return match.group(1) if match else prompt
+
+    @staticmethod
+    def _syllabus(text: str) -> Dict[str, Any]:
+        parsed, _ = RuleBasedParser().parse(text)
+        if parsed:
+            return parsed
+
+        rng = random.Random(hashlib.sha256(text.encode("utf-8")).hexdigest())
+        units = []
+        for unit_no in range(1, rng.randint(3, 6) + 1):
+            units.append({
+                "unit_no": unit_no,
+                "title": f"Unit {unit_no}",
+                "importance": rng.choice(["IMP", "LESS_IMP"]),
+                "minimum_hours": rng.randint(6, 14),
+                "topics": [
+                    {"topic": f"Topic {unit_no}.{t}", "subtopics": [f"Subtopic {unit_no}.{t}.{s}" for s in range(1, 3)]}
+                    for t in range(1, rng.randint(2, 5) + 1)
+                ],
+                "self_study": [],
+            })
+        return {
+            "code": f"FAKE{rng.randint(100, 999)}",
+            "name": "Offline Test Subject",
+            "credits": rng.randint(2, 5),
+            "exam_weightage": {"mid": 30, "end": 70},
+            "units": units,
+        }
+
+
+BACKENDS = {
+    "gemini": GeminiBackend,
+    "fake": FakeBackend,
+}
+
+
+def get_backend_class(name: Optional[str] = None) -> type:
+    """Backend class for name, or for LLM_BACKEND (default gemini)."""
+    name = (name or os.environ.get("LLM_BACKEND", "gemini")).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unsupported LLM backend: {name} (choose from {', '.join(BACKENDS)})")
+    return BACKENDS[name]
@@ -0,0 +1,64 @@
+import hashlib
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from planner.utils.cache import DiskCache
+from planner.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class ExtractionCache:
+    """
+    Persistent cache of validated extraction results keyed by prompt and model,
+    so byte-identical syllabus text never reaches Gemini twice.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_mb: Optional[float] = None,
+                 ttl_hours: Optional[float] = None, max_entries: Optional[int] = None):
+        # Priority: argument -> environment -> default
+        cache_dir = cache_dir or os.environ.get("LLM_CACHE_DIR", os.path.join("cache", "extraction"))
+        if max_mb is None:
+            max_mb = float(os.environ.get("LLM_CACHE_MAX_MB", 50))
+        if ttl_hours is None:
+            ttl_hours = float(os.environ.get("LLM_CACHE_TTL_HOURS", 24 * 30))
+        if max_entries is None:
+            max_entries = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", 5000))
+
+        # A size of 0 disables the cache
+        self.enabled = max_mb > 0
+        self.store = DiskCache(
+            cache_dir,
+            int(max_mb * 1024 * 1024),
+            ttl_seconds=ttl_hours * 3600 if ttl_hours > 0 else None,
+            max_entries=max_entries or None,
+        ) if self.enabled else None
+
+    @staticmethod
+    def key_for(prompt: str, model_name: str) -> str:
+        return hashlib.sha256(f"{model_name}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, prompt: str, model_name: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        return self.store.get(self.key_for(prompt, model_name))
+
+    def set(self, prompt: str, model_name: str, syllabus: Dict[str, Any]):
+        if self.enabled:
+            self.store.set(self.key_for(prompt, model_name), syllabus)
+
+    def stats(self) -> Dict[str, Any]:
+        if not self.enabled:
+            return {"enabled": False}
+        return {"enabled": True, **self.store.stats()}
+
+_default_cache: Optional[ExtractionCache] = None
+_default_cache_lock = threading.Lock()
+
+def get_default_cache() -> ExtractionCache:
+    """Process-wide cache shared by all extractor instances, so hit/miss counters add up."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ExtractionCache()
+        return _default_cache
@@ -0,0 +1,189 @@
+"""
+Process-wide LLM client registry.
+
+Responsibilities:
+- Configure the LLM backend (LLM_BACKEND) once per process instead of once per request
+- Keep model handles (and the SDK's HTTP clients behind them) alive across
+  requests and threads
+- Route every call through one ResilientLLMClient, so fallback state is shared
+- Report health and usage statistics, and warm up at server start
+
+For Gemini, genai.configure() replaces the SDK's global clients, so calling it per
+request threw away their connections; the registry only calls it again if the key
+or the LLM_* settings change.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from planner.ai.backends import LLMBackend, get_backend_class
+from planner.ai.resilience import ResilientLLMClient
+from planner.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class LLMClientRegistry:
+    """
+    Lazily configured holder of model handles. Thread-safe; share it via get_client_registry().
+    """
+
+    def __init__(self, api_key: Optional[str] = None, model_name: Optional[str] = None,
+                 fallback_models: Optional[str] = None, backend: Optional[str] = None):
+        # Priority: argument -> environment -> default
+        self.backend_class = get_backend_class(backend)
+        self.api_key = api_key or os.environ.get("GEMINI_API_KEY")
+        self.model_name = model_name or os.environ.get("LLM_MODEL", "gemini-flash-latest")
+        fallbacks = fallback_models or os.environ.get("LLM_FALLBACK_MODELS", "gemini-2.5-flash,gemini-2.0-flash")
+        self.fallback_models = [m.strip() for m in fallbacks.split(",") if m.strip()]
+
+        self._lock = threading.Lock()
+        self._configured = False
+        self._models: Dict[str, LLMBackend] = {}
+        self._client: Optional[ResilientLLMClient] = None
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "failures": 0,
+            "fallbacks": 0,
+            "latency_seconds": 0.0,
+            "by_model": {},
+            "last_error": None,
+            "last_success_at": None,
+        }
+
+    def check_credentials(self):
+        """Raises ValueError if the backend needs an API key and none is set."""
+        if not self.backend_class.requires_api_key:
+            return
+        if not self.api_key or self.api_key == "your_api_key_here":
+            logger.error("GEMINI_API_KEY is missing. Please check your .env file.")
+            raise ValueError("GEMINI_API_KEY not found in environment or arguments.")
+
+    def _ensure_configured(self):
+        if self._configured:
+            return
+        with self._lock:
+            if self._configured:
+                return
+            self.check_credentials()
+            self.backend_class.configure(self.api_key)
+            self._client = ResilientLLMClient([self.model_name, *self.fallback_models])
+            self._configured = True
+            logger.info(f"LLM client configured ({self.backend_class.__name__}, model '{self.model_name}').")
+
+    def model(self, model_name: str) -> LLMBackend:
+        """The shared backend handle for model_name, created on first use."""
+        self._ensure_configured()
+        model = self._models.get(model_name)
+        if model is None:
+            with self._lock:
+                model = self._models.get(model_name)
+                if model is None:
+                    model = self._models[model_name] = self.backend_class(model_name)
+        return model
+
+    def generate_json(self, prompt: str) -> Tuple[str, str]:
+        """
+        Sends prompt with a JSON response type through the resilient client.
+        Returns (response text, model that served it).
+        """
+        self._ensure_configured()
+        started = time.perf_counter()
+        try:
+            text, served_by = self._client.call(lambda model_name: self.model(model_name).generate_json(prompt))
+        except Exception as e:
+            self._record(started, None, e)
+            raise
+        self._record(started, served_by, None)
+        return text, served_by
+
+    def _record(self, started: float, served_by: Optional[str], error: Optional[Exception]):
+        with self._stats_lock:
+            stats = self._stats
+            stats["requests"] += 1
+            stats["latency_seconds"] += time.perf_counter() - started
+            if error is not None:
+                stats["failures"] += 1
+                stats["last_error"] = f"{type(error).__name__}: {error}"
+                return
+            stats["by_model"][served_by] = stats["by_model"].get(served_by, 0) + 1
+            if served_by != self.model_name:
+                stats["fallbacks"] += 1
+            stats["last_success_at"] = time.time()
+
+    def warm_up(self) -> bool:
+        """
+        Configures the backend and builds the primary model handle ahead of the first request.
+        Returns False (and logs) instead of raising, so a missing key doesn't stop the server.
+        """
+        try:
+            self.model(self.model_name)
+            return True
+        except Exception as e:
+            logger.warning(f"LLM client warm-up failed: {e}")
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = {**self._stats, "by_model": dict(self._stats["by_model"])}
+        requests = stats["requests"]
+        stats["avg_latency_seconds"] = round(stats["latency_seconds"] / requests, 3) if requests else None
+        stats["latency_seconds"] = round(stats["latency_seconds"], 3)
+        return stats
+
+    def health(self) -> Dict[str, Any]:
+        breaker = self._client.breaker.state if self._client else None
+        return {
+            "backend": self.backend_class.__name__,
+            "configured": self._configured,
+            "model": self.model_name,
+            "active_models": self._client.active_models() if self._client else [],
+            "loaded_models": list(self._models),
+            "circuit_breaker": breaker,
+            "healthy": self._configured and breaker != "open",
+            "usage": self.stats(),
+        }
+
+
+_registry: Optional[LLMClientRegistry] = None
+_registry_settings: Optional[Tuple[Optional[str], ...]] = None
+_registry_lock = threading.Lock()
+
+
+def _registry_key(api_key: Optional[str]) -> Tuple[Optional[str], ...]:
+    """The settings a registry is built from; any change means a new registry."""
+    return (
+        api_key or os.environ.get("GEMINI_API_KEY"),
+        os.environ.get("LLM_BACKEND"),
+        os.environ.get("LLM_MODEL"),
+        os.environ.get("LLM_FALLBACK_MODELS"),
+    )
+
+
+def get_client_registry(api_key: Optional[str] = None) -> LLMClientRegistry:
+    """
+    Process-wide registry shared by all extractor instances.
+    A different api_key, LLM_BACKEND, LLM_MODEL or LLM_FALLBACK_MODELS than the
+    current registry was built with replaces it.
+    """
+    global _registry, _registry_settings
+    with _registry_lock:
+        settings = _registry_key(api_key)
+        if _registry is None or _registry_settings != settings:
+            if _registry is not None:
+                logger.warning("LLM settings changed; reconfiguring the shared client.")
+            _registry = LLMClientRegistry(api_key=settings[0])
+            _registry_settings = settings
+        return _registry
+
+
+def reset_client_registry():
+    """Drops the shared registry; the next get_client_registry() builds a fresh one."""
+    global _registry, _registry_settings
+    with _registry_lock:
+        _registry = None
+        _registry_settings = None
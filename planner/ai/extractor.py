@@ -1,11 +1,17 @@
 import os
+import re
 import json
-from typing import Dict, Any, List, Optional
-import google.generativeai as genai
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
 from planner.utils.logger import setup_logger
+from planner.ai.cache import ExtractionCache, get_default_cache
+from planner.ai.clients import get_client_registry
+from planner.ai.rule_parser import RuleBasedParser
+from planner.utils.progress import ProgressCallback, report, timed_stage
 
 # Ensure environment variables are loaded
 load_dotenv()
@@ -32,68 +38,232 @@ class SyllabusSchema(BaseModel):
     exam_weightage: Dict[str, Any]
     units: List[UnitSchema]
 
+# Unit/module headings as emphasized by SyllabusCleaner.preserve_structural_markers
+UNIT_BOUNDARY = re.compile(r'\n\n(?=(?:Unit|Module|Chapter)\s+(?:\d+|[IVX]+)\s*:)', re.IGNORECASE)
+
+
+def split_into_chunks(text: str, max_chars: int) -> List[str]:
+    """
+    Splits cleaned syllabus text at unit/module headings and packs consecutive
+    sections into chunks of at most max_chars. A unit is never split; a single
+    unit longer than max_chars becomes its own chunk. The text before the first
+    heading (subject name, code, credits) stays at the start of the first chunk.
+    """
+    sections = [section.strip() for section in UNIT_BOUNDARY.split(text) if section.strip()]
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for section in sections:
+        if current and size + len(section) > max_chars:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(section)
+        size += len(section) + 2
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def merge_partial_syllabi(parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Deterministically merges per-chunk extractions (in document order) into one syllabus.
+    Subject fields come from the first part that has them. Units are ordered by unit_no;
+    a unit reported by several parts is combined: first non-empty title, IMP if any part
+    says so, the largest minimum_hours, topics and self-study items de-duplicated in order.
+    """
+    merged: Dict[str, Any] = {"code": "", "name": "", "credits": 0, "exam_weightage": {}, "units": []}
+    units: Dict[int, Dict[str, Any]] = {}
+
+    for part in parts:
+        for field in ("code", "name", "credits", "exam_weightage"):
+            if not merged[field] and part.get(field):
+                merged[field] = part[field]
+
+        for unit in part.get("units", []):
+            current = units.get(unit["unit_no"])
+            if current is None:
+                units[unit["unit_no"]] = {**unit, "topics": list(unit["topics"]),
+                                          "self_study": list(unit.get("self_study", []))}
+                continue
+            current["title"] = current["title"] or unit["title"]
+            if unit["importance"] == "IMP":
+                current["importance"] = "IMP"
+            hours = [h for h in (current.get("minimum_hours"), unit.get("minimum_hours")) if h is not None]
+            current["minimum_hours"] = max(hours) if hours else None
+            known_topics = {t["topic"] for t in current["topics"]}
+            current["topics"].extend(t for t in unit["topics"] if t["topic"] not in known_topics)
+            current["self_study"].extend(
+                item for item in unit.get("self_study", []) if item not in current["self_study"]
+            )
+
+    merged["units"] = [units[unit_no] for unit_no in sorted(units)]
+    return SyllabusSchema(**merged).model_dump()
+
+
+# How extractions were served in this process: rule-based parse, response cache, LLM call
+_route_counts = {"fast_path": 0, "cache": 0, "llm": 0}
+_route_lock = threading.Lock()
+
+
+def _record_route(route: str):
+    with _route_lock:
+        _route_counts[route] += 1
+        fast, total = _route_counts["fast_path"], sum(_route_counts.values())
+    logger.info(f"Extraction served by {route}; fast path {fast}/{total} ({fast / total:.0%}) so far.")
+
+
+def route_stats() -> Dict[str, int]:
+    with _route_lock:
+        return dict(_route_counts)
+
+
 class Syllabusextractor:
     """
-    Uses Gemini to extract structured syllabus data from cleaned text.
+    Uses Gemini (or the backend chosen by LLM_BACKEND) to extract structured syllabus data from cleaned text.
     """
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, cache: Optional[ExtractionCache] = None,
+                 use_cache: bool = True, progress: Optional[ProgressCallback] = None,
+                 chunk_chars: Optional[int] = None, chunk_concurrency: Optional[int] = None,
+                 fast_path: Optional[bool] = None, min_confidence: Optional[float] = None):
         # Priority: argument -> environment
         self.api_key = api_key or os.environ.get("GEMINI_API_KEY")
+
+        # Configured backend (LLM_BACKEND) and model handles are shared across requests and threads
+        self.clients = get_client_registry(self.api_key)
+        self.clients.check_credentials()
+
+        self.cache = cache or get_default_cache()
+        self.use_cache = use_cache
+        self.progress = progress
+
+        # Chunked mode: texts longer than this are extracted unit-group by unit-group
+        # (0 = always one prompt)
+        # Priority: argument -> environment -> default
+        if chunk_chars is None:
+            chunk_chars = int(os.environ.get("LLM_CHUNK_CHARS", 12000))
+        self.chunk_chars = max(0, chunk_chars)
+        # Upper bound on concurrent Gemini requests for one document
+        if chunk_concurrency is None:
+            chunk_concurrency = int(os.environ.get("LLM_CHUNK_CONCURRENCY", 4))
+        self.chunk_concurrency = max(1, chunk_concurrency)
+
+        # Rule-based parsing for well-structured syllabi; the LLM handles the rest
+        if fast_path is None:
+            fast_path = os.environ.get("LLM_FAST_PATH", "true").lower() in ("1", "true", "yes")
+        self.fast_path = fast_path
+        if min_confidence is None:
+            min_confidence = float(os.environ.get("FAST_PATH_MIN_CONFIDENCE", 0.8))
+        self.min_confidence = min_confidence
         
-        if not self.api_key or self.api_key == "your_api_key_here":
-            logger.error("GEMINI_API_KEY is missing. Please check your .env file.")
-            raise ValueError("GEMINI_API_KEY not found in environment or arguments.")
-        
-        try:
-            genai.configure(api_key=self.api_key)
-            # Some environments/keys hit 404 with 'gemini-1.5-flash'
-            # 'gemini-1.5-flash-latest' or 'gemini-1.5-flash' are standard
-            self.model = genai.GenerativeModel('gemini-flash-latest')
-            logger.info("Gemini AI Extractor initialized with 'gemini-flash-latest'.")
-        except Exception as e:
-            logger.error(f"Failed to initialize Gemini Model: {e}")
-            raise
+        self.model_name = self.clients.model_name
+        logger.info(f"Gemini AI Extractor initialized with '{self.model_name}'.")
 
-    def extract(self, text: str) -> Dict[str, Any]:
+    def extract(self, text: str, use_cache: Optional[bool] = None) -> Dict[str, Any]:
         """
         Extracts structured JSON from raw text.
+        Pass use_cache=False to bypass the response cache for this call.
         """
         if not text:
             return {}
 
+        if self.fast_path:
+            syllabus = self._extract_rule_based(text)
+            if syllabus is not None:
+                _record_route("fast_path")
+                return syllabus
+
+        use_cache = self.use_cache if use_cache is None else use_cache
+
+        chunks = split_into_chunks(text, self.chunk_chars) if 0 < self.chunk_chars < len(text) else [text]
+        if len(chunks) > 1:
+            return self._extract_chunked(chunks, use_cache)
+
         prompt = self._build_prompt(text)
+        with timed_stage(self.progress, "llm", f"Extracting syllabus with {self.model_name}"):
+            syllabus, cached = self._extract_prompt(prompt, use_cache)
+        _record_route("cache" if cached else "llm")
+        return syllabus
+
+    def _extract_rule_based(self, text: str) -> Optional[Dict[str, Any]]:
+        """Returns the rule-based parse, or None if it is not confident or not schema-valid."""
+        with timed_stage(self.progress, "llm", "Parsing syllabus structure"):
+            syllabus, confidence = RuleBasedParser().parse(text)
+            if syllabus is None or confidence < self.min_confidence:
+                logger.info(f"Fast path confidence {confidence} below {self.min_confidence}; using the LLM.")
+                return None
+            try:
+                syllabus = SyllabusSchema(**syllabus).model_dump()
+            except Exception as e:
+                logger.warning(f"Fast path result failed validation ({e}); using the LLM.")
+                return None
+        logger.info(f"Fast path parsed {len(syllabus['units'])} units (confidence {confidence}).")
+        return syllabus
+
+    def _extract_chunked(self, chunks: List[str], use_cache: bool) -> Dict[str, Any]:
+        """
+        Extracts each chunk concurrently (at most chunk_concurrency requests at a time)
+        and merges the partial results in document order.
+        """
+        total = len(chunks)
+        prompts = [self._build_prompt(chunk, part=i + 1, parts=total) for i, chunk in enumerate(chunks)]
+        workers = min(self.chunk_concurrency, total)
+        logger.info(f"Extracting long syllabus in {total} chunks with up to {workers} concurrent requests.")
+
+        with timed_stage(self.progress, "llm", f"Extracting syllabus in {total} parts with {self.model_name}"):
+            parts = []
+            all_cached = True
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                # map() yields in chunk order, which keeps the merge deterministic
+                for part, cached in pool.map(lambda p: self._extract_prompt(p, use_cache), prompts):
+                    parts.append(part)
+                    all_cached = all_cached and cached
+                    report(self.progress, "llm", message=f"Extracted part {len(parts)} of {total}",
+                           current=len(parts), total=total)
+            syllabus = merge_partial_syllabi(parts)
+        # One LLM call among the parts makes it an LLM extraction
+        _record_route("cache" if all_cached else "llm")
+        return syllabus
+
+    def _extract_prompt(self, prompt: str, use_cache: bool) -> Tuple[Dict[str, Any], bool]:
+        """Returns (syllabus, served from the response cache)."""
+        if use_cache:
+            cached = self.cache.get(prompt, self.model_name)
+            if cached is not None:
+                logger.info(f"Extraction cache hit ({self.cache.stats()}).")
+                report(self.progress, "llm", message="Cache hit")
+                return cached, True
         
         logger.info("Sending request to Gemini for syllabus extraction...")
         try:
-            # We explicitly allow the model to provide JSON
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.GenerationConfig(
-                    response_mime_type="application/json",
-                ),
-            )
-            
-            if not response.text:
-                raise ValueError("Gemini returned an empty response.")
+            text, served_by = self.clients.generate_json(prompt)
+            if served_by != self.model_name:
+                logger.warning(f"Extraction served by fallback model '{served_by}'.")
 
-            result_json = json.loads(response.text)
+            result_json = json.loads(text)
             
             # Validate with Pydantic
             validated = SyllabusSchema(**result_json)
-            return validated.model_dump()
+            syllabus = validated.model_dump()
+            if use_cache:
+                self.cache.set(prompt, self.model_name, syllabus)
+            return syllabus, False
             
         except Exception as e:
             logger.error(f"Error during AI extraction: {e}")
-            if "404" in str(e):
-                logger.error("Model 404 detected. Trying fallback to 'gemini-pro'...")
-                # Fallback logic if needed, but 1.5-flash should work.
-                # This often happens if the API version is mismatched in the library.
             raise
 
-    def _build_prompt(self, text: str) -> str:
+    def _build_prompt(self, text: str, part: int = 1, parts: int = 1) -> str:
+        scope = ""
+        if parts > 1:
+            scope = (
+                f"This text is part {part} of {parts} of a longer syllabus. Extract only the units "
+                "that appear in it. If the subject code, name, credits or exam weightage are not "
+                "in this part, use empty values (\"\", 0, {})."
+            )
         return f"""
         You are an expert academic administrator. Extract the following syllabus information into a strict JSON format.
+        {scope}
         
         Syllabus Text:
         ---
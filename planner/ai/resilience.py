@@ -0,0 +1,242 @@
+"""
+Resilient calls to the LLM API.
+
+Responsibilities:
+- Rate-limit requests with a token bucket shared by every request in the process
+- Retry transient failures (429, 5xx, timeouts) with jittered exponential backoff
+- Fail fast through a circuit breaker while the API keeps failing
+- Fall back to the next configured model when a model returns 404
+
+The breaker and the bucket are process-wide, so concurrent uploads share one
+budget and one view of API health instead of each retrying on its own.
+"""
+
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+from planner.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# HTTP statuses worth retrying; google.api_core exceptions carry them in `.code`
+RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+
+# gRPC status names (exc.grpc_status_code) as HTTP statuses
+GRPC_STATUS_CODES = {
+    "NOT_FOUND": 404,
+    "RESOURCE_EXHAUSTED": 429,
+    "INTERNAL": 500,
+    "UNAVAILABLE": 503,
+    "DEADLINE_EXCEEDED": 504,
+}
+
+
+class LLMUnavailableError(Exception):
+    """Raised without calling the API while the circuit breaker is open."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _status_code(exc: Exception) -> Optional[int]:
+    """
+    HTTP status from typed attributes only. Numbers in the message ("1500 tokens")
+    are never trusted; errors without a status are treated as non-retryable.
+    """
+    code = getattr(exc, "code", None)
+    if isinstance(code, int) and not isinstance(code, bool):
+        return code
+    grpc_code = getattr(exc, "grpc_status_code", None)
+    if grpc_code is not None:
+        return GRPC_STATUS_CODES.get(getattr(grpc_code, "name", None))
+    return None
+
+
+def is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    return _status_code(exc) in RETRYABLE_CODES
+
+
+def is_model_not_found(exc: Exception) -> bool:
+    return _status_code(exc) == 404
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full jitter: uniform between 0 and min(cap, base * 2^attempt)."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second on average, with bursts up to `capacity`.
+    acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_timeout` seconds. Then a single trial call is let through (half-open):
+    success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = "closed"  # closed / open / half_open
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == "open":
+                remaining = self._opened_at + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    raise LLMUnavailableError(
+                        f"LLM API temporarily unavailable; retry in {remaining:.0f}s", remaining
+                    )
+                self.state = "half_open"
+                logger.info("Circuit breaker half-open; sending a trial request.")
+            elif self.state == "half_open":
+                # Only the trial request goes through until it resolves
+                raise LLMUnavailableError("LLM API is being probed; retry shortly", 1.0)
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logger.info("Circuit breaker closed; LLM API healthy again.")
+            self.state = "closed"
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning(f"Circuit breaker opened after {self._failures} failures.")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class ResilientLLMClient:
+    """
+    Runs `call(model_name)` with rate limiting, retries, circuit breaking and
+    model fallback. Returns (result, model_name that served it).
+    """
+
+    def __init__(self, model_names: List[str], rate_limiter: Optional[TokenBucket] = None,
+                 breaker: Optional[CircuitBreaker] = None, max_retries: Optional[int] = None,
+                 backoff_base: Optional[float] = None, backoff_cap: Optional[float] = None):
+        # Shared by every thread using this client; guarded by _models_lock
+        self.model_names = list(dict.fromkeys(model_names))
+        self._models_lock = threading.Lock()
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.breaker = breaker or get_circuit_breaker()
+
+        # Priority: argument -> environment -> default
+        if max_retries is None:
+            max_retries = int(os.environ.get("LLM_MAX_RETRIES", 4))
+        self.max_retries = max(0, max_retries)
+        if backoff_base is None:
+            backoff_base = float(os.environ.get("LLM_BACKOFF_BASE", 1.0))
+        self.backoff_base = backoff_base
+        if backoff_cap is None:
+            backoff_cap = float(os.environ.get("LLM_BACKOFF_CAP", 30.0))
+        self.backoff_cap = backoff_cap
+
+    def active_models(self) -> List[str]:
+        """Models still in the fallback chain, in order."""
+        with self._models_lock:
+            return list(self.model_names)
+
+    def call(self, call: Callable[[str], Any]) -> Tuple[Any, str]:
+        last_error: Optional[Exception] = None
+        for model_name in self.active_models():
+            try:
+                return self._call_model(call, model_name), model_name
+            except Exception as e:
+                if not is_model_not_found(e):
+                    raise
+                last_error = e
+                logger.error(f"Model '{model_name}' not found (404); trying the next fallback model.")
+                # Don't pay for the 404 again on later calls while another model remains
+                with self._models_lock:
+                    if model_name in self.model_names and len(self.model_names) > 1:
+                        self.model_names.remove(model_name)
+        raise last_error
+
+    def _call_model(self, call: Callable[[str], Any], model_name: str) -> Any:
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            self.rate_limiter.acquire()
+            try:
+                result = call(model_name)
+            except Exception as e:
+                if not is_retryable(e):
+                    # The API answered (bad request, missing model); it is not unhealthy
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if attempt >= self.max_retries:
+                    raise
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_cap)
+                attempt += 1
+                logger.warning(f"Transient LLM error ({e}); retry {attempt}/{self.max_retries} in {delay:.1f}s.")
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+
+_shared_lock = threading.Lock()
+_rate_limiter: Optional[TokenBucket] = None
+_breaker: Optional[CircuitBreaker] = None
+
+
+def get_rate_limiter() -> TokenBucket:
+    """The process-wide request budget (LLM_RATE_PER_MIN, LLM_RATE_BURST)."""
+    global _rate_limiter
+    with _shared_lock:
+        if _rate_limiter is None:
+            per_minute = float(os.environ.get("LLM_RATE_PER_MIN", 60))
+            burst = int(os.environ.get("LLM_RATE_BURST", 5))
+            _rate_limiter = TokenBucket(per_minute / 60.0, burst)
+        return _rate_limiter
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """The process-wide view of API health (LLM_BREAKER_FAILURES, LLM_BREAKER_RESET_SECONDS)."""
+    global _breaker
+    with _shared_lock:
+        if _breaker is None:
+            _breaker = CircuitBreaker(
+                int(os.environ.get("LLM_BREAKER_FAILURES", 5)),
+                float(os.environ.get("LLM_BREAKER_RESET_SECONDS", 30)),
+            )
+        return _breaker
@@ -0,0 +1,239 @@
+"""
+Rule-based syllabus parser (the extraction fast path).
+
+Responsibilities:
+- Parse cleaned syllabus text with explicit "Unit N: Title (X Hours)" headings
+  and bullet lists into the SyllabusSchema shape, without calling the LLM
+- Score how much of the text the rules understood (confidence 0..1)
+- Leave anything it cannot read confidently to Syllabusextractor's LLM path
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from planner.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+ROMAN = {"I": 1, "V": 5, "X": 10}
+
+UNIT_HEADING = re.compile(
+    r'^(?:Unit|Module|Chapter)\s+(\d+|[IVX]+)\s*[:.\-]\s*(.*?)\s*'
+    r'(?:[(\[]\s*(\d+)\s*(?:Hours?|Hrs?\.?|Lectures?)\s*[)\]])?\s*$',
+    re.IGNORECASE,
+)
+HOURS_LINE = re.compile(r'^(?:Hours|Teaching Hours|Lectures)\s*\d*\s*[:\-]\s*(\d+)', re.IGNORECASE)
+IMPORTANCE_LINE = re.compile(r'^Importance\s*\d*\s*[:\-]\s*(.+)$', re.IGNORECASE)
+SELF_STUDY_LINE = re.compile(r'^Self[\s\-]?Study\s*[:\-]\s*(.*)$', re.IGNORECASE)
+BULLET = re.compile(r'^-\s+(.+)$')
+NUMBERED = re.compile(r'^(\d+(?:\.\d+)*)\s+(.+)$')
+
+CODE_LINE = re.compile(r'(?:Subject|Course)\s*Code\s*[:\-]\s*([A-Z0-9][A-Z0-9\- ]*[0-9][A-Z]?)', re.IGNORECASE)
+CODE_TOKEN = re.compile(r'\b([A-Z]{2,6}\s?-?\d{3,4}[A-Z]?)\b')
+NAME_LINE = re.compile(r'^(?:Subject|Course)\s*(?:Name|Title)?\s*[:\-]\s*(.+)$', re.IGNORECASE)
+CREDITS = re.compile(r'Credits?\s*[:\-]?\s*(\d+)', re.IGNORECASE)
+WEIGHTAGE = re.compile(
+    r'\b(Mid(?:term|[\s\-]?sem(?:ester)?)?|End(?:[\s\-]?sem(?:ester)?)?|Final|Internal|External|'
+    r'Practical|Assignments?|Quiz(?:zes)?|Project)\b[^\n%]*?(\d{1,3})\s*%',
+    re.IGNORECASE,
+)
+
+
+def _unit_number(token: str) -> int:
+    if token.isdigit():
+        return int(token)
+    values = [ROMAN[c] for c in token.upper()]
+    return sum(-v if i + 1 < len(values) and v < values[i + 1] else v for i, v in enumerate(values))
+
+
+def _split_list(text: str) -> List[str]:
+    return [item.strip(" .") for item in re.split(r'[,;]', text) if item.strip(" .")]
+
+
+class RuleBasedParser:
+    """
+    Deterministic parser for well-structured syllabi.
+    parse() returns (syllabus, confidence); syllabus is None when no unit headings were found
+    or the unit numbers repeat or go backwards.
+    """
+
+    def parse(self, text: str) -> Tuple[Optional[Dict[str, Any]], float]:
+        lines = [line.strip() for line in text.splitlines()]
+        content_lines = sum(1 for line in lines if line)
+        if not content_lines:
+            return None, 0.0
+
+        header: List[str] = []
+        units: List[Dict[str, Any]] = []
+        unit: Optional[Dict[str, Any]] = None
+        understood = 0
+        # Units whose topics came from bullet or numbered lists, not from prose
+        listed = set()
+
+        for line in lines:
+            if not line:
+                continue
+
+            heading = UNIT_HEADING.match(line)
+            if heading:
+                unit = {
+                    "unit_no": _unit_number(heading.group(1)),
+                    "title": heading.group(2).strip(" -:"),
+                    "importance": None,
+                    "minimum_hours": int(heading.group(3)) if heading.group(3) else None,
+                    "topics": [],
+                    "self_study": [],
+                }
+                units.append(unit)
+                understood += 1
+                continue
+
+            if unit is None:
+                header.append(line)
+                continue
+
+            kind = self._parse_unit_line(unit, line)
+            if kind in ("field", "list"):
+                understood += 1
+            if kind == "list":
+                listed.add(len(units) - 1)
+
+        if not units:
+            return None, 0.0
+        numbers = [u["unit_no"] for u in units]
+        if any(b <= a for a, b in zip(numbers, numbers[1:])):
+            # Repeated or out-of-order unit numbers: several subjects in one document,
+            # or headings the rules misread. Either way, not one syllabus.
+            return None, 0.0
+
+        syllabus = {
+            **self._parse_header(header),
+            "units": units,
+        }
+        self._assign_importance(units)
+        # Only header lines the patterns actually read; a free-text name line does not count
+        understood += sum(1 for line in header if self._is_header_field(line))
+
+        return syllabus, self._confidence(syllabus, understood / content_lines, len(listed))
+
+    @staticmethod
+    def _is_header_field(line: str) -> bool:
+        return bool(
+            CODE_LINE.search(line) or NAME_LINE.match(line) or CREDITS.search(line) or WEIGHTAGE.search(line)
+        )
+
+    def _parse_unit_line(self, unit: Dict[str, Any], line: str) -> Optional[str]:
+        """
+        Applies one body line to the current unit. Returns what the line was read as:
+        "field" (hours, importance, self study), "list" (bullet or numbered topic),
+        "loose" (run-on list or wrapped continuation, which prose also looks like),
+        or None if the line wasn't understood.
+        """
+        match = HOURS_LINE.match(line)
+        if match:
+            unit["minimum_hours"] = int(match.group(1))
+            return "field"
+
+        match = IMPORTANCE_LINE.match(line)
+        if match:
+            value = match.group(1).strip().upper()
+            unit["importance"] = "LESS_IMP" if value.startswith(("LESS", "LOW")) else "IMP"
+            return "field"
+
+        match = SELF_STUDY_LINE.match(line)
+        if match:
+            unit["self_study"].extend(_split_list(match.group(1)))
+            return "field"
+
+        match = BULLET.match(line)
+        numbered = NUMBERED.match(line)
+        if match:
+            item = match.group(1)
+            # "- Topic: sub, sub" carries its subtopics inline
+            topic, _, subtopics = item.partition(":")
+            unit["topics"].append({"topic": topic.strip(), "subtopics": _split_list(subtopics)})
+            return "list"
+        if numbered:
+            number, item = numbered.groups()
+            if "." in number and unit["topics"]:
+                # "1.2 Subtopic" belongs to the last "1 Topic"
+                unit["topics"][-1]["subtopics"].append(item.strip())
+            else:
+                unit["topics"].append({"topic": item.strip(), "subtopics": []})
+            return "list"
+
+        if unit["topics"] and line[0].islower():
+            # Wrapped continuation of the previous bullet
+            unit["topics"][-1]["topic"] += f" {line}"
+            return "loose"
+        if not unit["topics"] and ("," in line or ";" in line):
+            # Run-on topic list under the heading: "Topic A, Topic B; Topic C"
+            unit["topics"].extend({"topic": t, "subtopics": []} for t in _split_list(line))
+            return "loose"
+        return None
+
+    def _parse_header(self, lines: List[str]) -> Dict[str, Any]:
+        text = "\n".join(lines)
+        code = CODE_LINE.search(text) or CODE_TOKEN.search(text)
+        credits = CREDITS.search(text)
+
+        name = ""
+        for line in lines:
+            match = NAME_LINE.match(line)
+            if match and not CODE_LINE.match(line):
+                name = match.group(1).strip()
+                break
+        if not name:
+            # First line that is not just code/credits/weightage
+            for line in lines:
+                if not (CREDITS.search(line) or WEIGHTAGE.search(line)) and re.search(r'[A-Za-z]{3}', line):
+                    name = line
+                    break
+        if code and name:
+            name = name.replace(code.group(1), "").strip(" -:|()")
+
+        return {
+            "code": code.group(1).replace(" ", "") if code else "",
+            "name": name,
+            "credits": int(credits.group(1)) if credits else 0,
+            "exam_weightage": {
+                # "Mid Semester" -> "mid", "Final" -> "final"
+                re.match(r'[a-z]+', label.lower()).group(0): int(value)
+                for label, value in WEIGHTAGE.findall(text)
+            },
+        }
+
+    def _assign_importance(self, units: List[Dict[str, Any]]):
+        """
+        Units without an explicit Importance line are IMP when they carry at least
+        the average teaching load (hours, or topic count when hours are missing).
+        """
+        def load(u):
+            return u["minimum_hours"] if u["minimum_hours"] is not None else len(u["topics"])
+
+        loads = [load(u) for u in units]
+        average = sum(loads) / len(loads)
+        for u in units:
+            if u["importance"] is None:
+                u["importance"] = "IMP" if load(u) >= average else "LESS_IMP"
+
+    def _confidence(self, syllabus: Dict[str, Any], coverage: float, listed_units: int) -> float:
+        units = syllabus["units"]
+        # Numbers are strictly increasing here; gaps (1, 2, 4) still cost confidence
+        sequential = [u["unit_no"] for u in units] == list(range(1, len(units) + 1))
+        # Topics split out of prose are guesses; only bullet/numbered lists count
+        with_topics = listed_units / len(units)
+        with_hours = sum(1 for u in units if u["minimum_hours"]) / len(units)
+
+        score = (
+            0.35 * coverage
+            + 0.25 * with_topics
+            + 0.15 * with_hours
+            + 0.15 * sequential
+            + 0.05 * bool(syllabus["name"])
+            + 0.05 * bool(syllabus["code"])
+        )
+        if not listed_units:
+            # No topic lists at all: prose syllabus, leave it to the LLM
+            score = min(score, 0.5)
+        return round(min(score, 1.0), 3)
@@ -0,0 +1,137 @@
+"""
+Cohort batch planning.
+
+Responsibilities:
+- Plan one shared subject set for many students with per-student settings
+- Parse subjects and build calendars once, not once per student
+- Fan students out across a process pool and write their outputs in bulk
+
+Per-student settings override the shared semester config, e.g.
+{"id": "s042", "start_date": "2026-01-19", "rest_days": ["Sunday"],
+ "revision_weeks": 2, "difficulty_multiplier": 1.3, "daily_hours": 4}
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from planner.engine.planner_engine import PlannerEngine, build_weeks
+from planner.models.syllabus import Subject
+from planner.utils.logger import setup_logger
+from planner.writers.excel_writer import ExcelWriter
+
+logger = setup_logger(__name__)
+
+# Per-worker shared state, set once by _init_worker instead of pickled per student
+_subjects: List[Subject] = []
+_calendars: Dict[tuple, dict] = {}
+_output_dir: Optional[str] = None
+
+
+def calendar_key(config: Dict[str, Any]) -> tuple:
+    return (
+        config["start_date"],
+        config["end_date"],
+        tuple(sorted(config.get("rest_days", []))),
+        json.dumps(config.get("holidays", []), sort_keys=True),
+        json.dumps(config.get("blackouts", []), sort_keys=True),
+    )
+
+
+def _init_worker(subjects: List[Subject], calendars: Dict[tuple, dict], output_dir: Optional[str]):
+    global _subjects, _calendars, _output_dir
+    _subjects = subjects
+    _calendars = calendars
+    _output_dir = output_dir
+
+
+def _plan_student(student_id: str, config: Dict[str, Any]) -> Dict[str, Any]:
+    """Plans one student against the worker's shared subjects and calendars."""
+    key = calendar_key(config)
+    weeks = _calendars.get(key)
+    if weeks is None:
+        weeks = _calendars[key] = build_weeks(config)
+
+    engine = PlannerEngine(_subjects, config, weeks=weeks)
+    rows = engine.generate_plan_with_time()
+
+    summary = {
+        "student_id": student_id,
+        "rows": len(rows),
+        "weeks": max((r["week"] for r in rows), default=0),
+        "overflow_hours": engine.overflow_report["hours"],
+        "output": None,
+    }
+
+    if _output_dir:
+        writer = ExcelWriter()
+        writer.write_plan(rows, _subjects)
+        out_file = os.path.join(_output_dir, f"{student_id}.xlsx")
+        writer.save(out_file)
+        summary["output"] = out_file
+
+    return summary
+
+
+class CohortPlanner:
+    """
+    Plans a cohort of students that share the same subjects.
+    Each worker process receives the parsed subjects and precomputed calendars once.
+    """
+
+    def __init__(self, subjects: List[Subject], semester_config: Dict[str, Any],
+                 workers: Optional[int] = None):
+        self.subjects = subjects
+        self.semester_config = semester_config
+        # Priority: argument -> environment -> CPU count
+        if workers is None:
+            workers = int(os.environ.get("COHORT_WORKERS", os.cpu_count() or 1))
+        self.workers = max(1, workers)
+
+    def student_config(self, student: Dict[str, Any]) -> Dict[str, Any]:
+        overrides = {k: v for k, v in student.items() if k not in ("id", "student_id")}
+        return {**self.semester_config, **overrides}
+
+    def plan(self, students: List[Dict[str, Any]], output_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Plans every student and returns one summary per student, in input order.
+        With output_dir, each student's workbook is written there as <student_id>.xlsx
+        and the summaries are saved to cohort_summary.json.
+        """
+        ids = [str(s.get("id") or s.get("student_id") or f"student_{i + 1}") for i, s in enumerate(students)]
+        configs = [self.student_config(s) for s in students]
+
+        # Students mostly share a handful of semester layouts: build each calendar once
+        calendars: Dict[tuple, dict] = {}
+        for config in configs:
+            key = calendar_key(config)
+            if key not in calendars:
+                calendars[key] = build_weeks(config)
+
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        logger.info(
+            f"Planning {len(students)} students over {len(calendars)} distinct calendars "
+            f"with {self.workers} workers."
+        )
+
+        if self.workers == 1 or len(students) <= 1:
+            _init_worker(self.subjects, calendars, output_dir)
+            summaries = [_plan_student(i, c) for i, c in zip(ids, configs)]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.subjects, calendars, output_dir),
+            ) as pool:
+                # Batch students per task to keep IPC overhead low for large cohorts
+                chunksize = max(1, len(students) // (self.workers * 4))
+                summaries = list(pool.map(_plan_student, ids, configs, chunksize=chunksize))
+
+        if output_dir:
+            with open(os.path.join(output_dir, "cohort_summary.json"), "w") as f:
+                json.dump(summaries, f, indent=2)
+
+        return summaries
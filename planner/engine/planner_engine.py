@@ -11,23 +11,79 @@ This is the brain of the planner.
 If planning behavior is wrong, debug here first.
 """
 
+import os
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
-from planner.models.syllabus import Subject, Unit, Topic
+from typing import List, Dict, Any, Optional, Tuple
+from planner.models.syllabus import Subject, Unit, Topic, UnitDelta
 from planner.utils.logger import setup_logger
-from planner.utils.dates import generate_study_days,group_days_by_week
+from planner.utils.dates import study_weeks, exclusion_index
 
 logger = setup_logger(__name__)
 
+# Subject name of the cross-subject revision rows at the end of a plan
+REVISION_SUBJECT = "ALL SUBJECTS"
+
+# "count": the same number of topics every week; "capacity": pack topics by hours per week
+SCHEDULING_MODES = ("count", "capacity")
+
+def scheduling_mode(semester_config: dict, mode: Optional[str] = None) -> str:
+    """
+    The scheduling mode to plan with. Raises ValueError for an unknown mode.
+    Priority: argument -> semester config "scheduling" -> PLAN_SCHEDULING environment -> count
+    """
+    mode = mode or semester_config.get("scheduling") or os.environ.get("PLAN_SCHEDULING", "count")
+    mode = mode.strip().lower()
+    if mode not in SCHEDULING_MODES:
+        raise ValueError(f"Unsupported scheduling mode: {mode} (choose from {', '.join(SCHEDULING_MODES)})")
+    return mode
+
+def overflow_summary(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Totals the "overflow_hours" of capacity-scheduled rows:
+    {"weeks": {week_no: hours}, "topics": rows over capacity, "hours": total}.
+    """
+    overflow_by_week = {}
+    topics = 0
+    for r in rows:
+        if r.get("overflow_hours"):
+            overflow_by_week[r["week"]] = round(overflow_by_week.get(r["week"], 0) + r["overflow_hours"], 1)
+            topics += 1
+    return {
+        "weeks": overflow_by_week,
+        "topics": topics,
+        "hours": round(sum(overflow_by_week.values()), 1),
+    }
+
+def build_weeks(semester_config) -> dict:
+    """Builds the {week_no: [study dates]} calendar for a semester config."""
+    start = datetime.strptime(
+        semester_config["start_date"], "%Y-%m-%d"
+    ).date()
+
+    end = datetime.strptime(
+        semester_config["end_date"], "%Y-%m-%d"
+    ).date()
+
+    rest_days = semester_config.get("rest_days", [])
+    # Public holidays, exam weeks and breaks are not study days
+    exclusions = exclusion_index(
+        semester_config.get("holidays", []), semester_config.get("blackouts", [])
+    )
+    return study_weeks(start, end, rest_days, exclusions)
+
 class PlannerEngine:
     """
     Converts syllabus data into a flat planning structure.
     
     """
 
-    def __init__(self, subjects: list[Subject],semester_config):
+    def __init__(self, subjects: list[Subject],semester_config, weeks=None):
         self.subjects = subjects
         self.semester_config = semester_config
+        # Optional precomputed {week_no: [dates]} calendar, e.g. shared across a cohort
+        self.weeks = weeks
+        # Filled by capacity scheduling: hours that didn't fit their week
+        self.overflow_report = {"weeks": {}, "topics": 0, "hours": 0}
 
     def generate_plan(self) -> list[dict]:
         plan_rows = []
@@ -61,17 +117,216 @@ class PlannerEngine:
         return plan_rows
 
     def generate_plan_with_time(self):
-        start = datetime.strptime(
-            self.semester_config["start_date"], "%Y-%m-%d"
-        ).date()
+        if scheduling_mode(self.semester_config) == "capacity":
+            return self.generate_plan_by_capacity()
 
-        end = datetime.strptime(
-            self.semester_config["end_date"], "%Y-%m-%d"
-        ).date()
+        weeks, total_weeks, revision_weeks_count, study_weeks_limit = self._build_calendar()
+        all_topics = self._collect_topics()
 
-        rest_days = self.semester_config.get("rest_days", [])
-        study_days = generate_study_days(start, end, rest_days)
-        weeks = group_days_by_week(study_days)
+        # 3. Calculate Topics Per Week
+        topics_per_week = max(1, len(all_topics) // study_weeks_limit)
+        
+        plan_rows = []
+        current_week = 1
+        count_in_week = 0
+
+        for item in all_topics:
+            if count_in_week >= topics_per_week and current_week < study_weeks_limit:
+                current_week += 1
+                count_in_week = 0
+
+            plan_rows.append(self._topic_row(item, current_week, weeks[current_week]))
+            count_in_week += 1
+
+        plan_rows.extend(self._revision_rows(weeks, study_weeks_limit, total_weeks))
+        return plan_rows
+
+    def generate_plan_by_capacity(self):
+        """
+        Packs topics into weeks by hours instead of by topic count.
+
+        Week capacity = study days in that week x daily_hours. Topics are taken in
+        priority order and placed greedily: a topic goes into the current week if it
+        fits, otherwise the next week is opened. Single pass, so it scales linearly
+        with the number of topics (plus the sort).
+
+        Hours that cannot fit anywhere are not hidden: affected rows get
+        "overflow_hours" and the totals are kept in self.overflow_report.
+        """
+        weeks, total_weeks, revision_weeks_count, study_weeks_limit = self._build_calendar()
+        all_topics = self._collect_topics()
+        daily_hours = self.semester_config.get("daily_hours", 3)
+
+        plan_rows = []
+        current_week = 1
+        capacity = len(weeks[current_week]) * daily_hours
+        used = 0.0
+
+        for item in all_topics:
+            hours = self._topic_hours(item)
+
+            # Open the next week when this topic doesn't fit in what's left,
+            # unless the current week is still empty (oversized topic) or it's the last one
+            if used > 0 and used + hours > capacity and current_week < study_weeks_limit:
+                current_week += 1
+                capacity = len(weeks[current_week]) * daily_hours
+                used = 0.0
+
+            row = self._topic_row(item, current_week, weeks[current_week])
+            over = round(max(0.0, used + hours - capacity) - max(0.0, used - capacity), 1)
+            if over > 0:
+                row["overflow_hours"] = over
+            used += hours
+            plan_rows.append(row)
+
+        self.overflow_report = overflow_summary(plan_rows)
+        if self.overflow_report["weeks"]:
+            logger.warning(
+                f"Plan exceeds weekly capacity by {self.overflow_report['hours']}h "
+                f"across weeks {sorted(self.overflow_report['weeks'])} ({daily_hours}h/day)."
+            )
+
+        plan_rows.extend(self._revision_rows(weeks, study_weeks_limit, total_weeks))
+        return plan_rows
+
+    def replan(self, previous_rows: List[Dict[str, Any]],
+               deltas: List[UnitDelta]) -> Tuple[List[Dict[str, Any]], List[int]]:
+        """
+        Incremental re-planning after small edits (minimum_hours, importance, title).
+
+        Applies the deltas to self.subjects and updates `previous_rows`, the output of
+        generate_plan_with_time for the same subjects and config, instead of planning
+        from scratch. Returns (rows, changed) where `changed` lists the indices of rows
+        that differ; unchanged rows are the same dict objects as before.
+
+        - Count mode: weeks depend only on topic counts, so just the edited units'
+          rows are recomputed.
+        - Capacity mode: the greedy packing resumes at the week of the first edited
+          topic and stops as soon as it lines up with the previous plan again.
+        """
+        units = {}
+        for subject in self.subjects:
+            for unit in subject.units:
+                units[(subject.name, unit.unit_no)] = (subject, unit)
+                units.setdefault((subject.code, unit.unit_no), (subject, unit))
+
+        # Hours per topic before the edit, to replay the previous capacity pass
+        old_hours: Dict[tuple, float] = {}
+        affected = set()
+        for delta in deltas:
+            found = units.get((delta.subject, delta.unit_no))
+            if found is None:
+                raise ValueError(f"Unknown unit {delta.unit_no} of subject {delta.subject}")
+            subject, unit = found
+            key = (subject.name, unit.unit_no)
+            old_hours.setdefault(key, self._unit_hours(subject, unit))
+            for field in ("minimum_hours", "importance", "title"):
+                value = getattr(delta, field)
+                if value is not None:
+                    setattr(unit, field, value)
+            affected.add(key)
+
+        topic_count = sum(len(u.topics) for s in self.subjects for u in s.units)
+        if not affected or len(previous_rows) < topic_count:
+            if affected:
+                logger.warning("Previous plan doesn't match the subjects, re-planning from scratch.")
+                rows = self.generate_plan_with_time()
+                return rows, list(range(len(rows)))
+            return list(previous_rows), []
+
+        rows = list(previous_rows)
+        changed = set()
+        hours = {key: self._unit_hours(*units[key]) for key in affected}
+
+        # Refresh the descriptive fields and hours of the edited units' rows
+        first_affected = last_affected = None
+        for i in range(topic_count):
+            key = (rows[i]["subject"], rows[i]["unit"])
+            if key not in affected:
+                continue
+            unit = units[key][1]
+            row = {**rows[i], "unit_title": unit.title, "importance": unit.importance,
+                   "estimated_hours": round(hours[key], 1)}
+            if row != rows[i]:
+                rows[i] = row
+                changed.add(i)
+            if first_affected is None:
+                first_affected = i
+            last_affected = i
+
+        if first_affected is not None and scheduling_mode(self.semester_config) == "capacity":
+            changed |= self._repack(rows, previous_rows, units, hours, old_hours,
+                                    first_affected, last_affected, topic_count)
+
+        logger.info(f"Re-planned {len(affected)} units: {len(changed)} of {len(rows)} rows changed.")
+        return rows, sorted(changed)
+
+    def _unit_hours(self, subject: Subject, unit: Unit) -> float:
+        diff_mult = self.semester_config.get(
+            "difficulty_multiplier", getattr(subject, 'difficulty_multiplier', 1.0)
+        )
+        return self._topic_hours({"unit": unit, "diff_mult": diff_mult})
+
+    def _repack(self, rows, previous_rows, units, hours, old_hours, first, last, topic_count):
+        """
+        Re-runs the capacity packing of generate_plan_by_capacity from the start of the
+        week before row `first`. Updates `rows` in place and returns the changed indices.
+        """
+        weeks, total_weeks, revision_weeks_count, study_weeks_limit = self._build_calendar()
+        daily_hours = self.semester_config.get("daily_hours", 3)
+
+        def new_hours(i):
+            key = (rows[i]["subject"], rows[i]["unit"])
+            return hours[key] if key in hours else self._unit_hours(*units[key])
+
+        def prev_hours(i):
+            key = (rows[i]["subject"], rows[i]["unit"])
+            return old_hours[key] if key in old_hours else new_hours(i)
+
+        # The edited topic may now fit into the previous topic's week, so replay from its start
+        anchor = max(first - 1, 0)
+        start = anchor
+        while start > 0 and previous_rows[start - 1]["week"] == previous_rows[anchor]["week"]:
+            start -= 1
+
+        changed = set()
+        current_week = previous_rows[start]["week"]
+        capacity = len(weeks[current_week]) * daily_hours
+        used = prev_used = 0.0
+
+        for i in range(start, topic_count):
+            if i > start:
+                # Past the last edit with the same week and fill as before: the rest is unchanged
+                if i > last and current_week == previous_rows[i - 1]["week"] and used == prev_used:
+                    break
+                if previous_rows[i]["week"] != previous_rows[i - 1]["week"]:
+                    prev_used = 0.0
+            prev_used += prev_hours(i)
+
+            h = new_hours(i)
+            if used > 0 and used + h > capacity and current_week < study_weeks_limit:
+                current_week += 1
+                capacity = len(weeks[current_week]) * daily_hours
+                used = 0.0
+
+            week_days = weeks[current_week]
+            row = {**rows[i], "week": current_week, "start_date": week_days[0], "end_date": week_days[-1]}
+            row.pop("overflow_hours", None)
+            over = round(max(0.0, used + h - capacity) - max(0.0, used - capacity), 1)
+            if over > 0:
+                row["overflow_hours"] = over
+            used += h
+
+            if row != rows[i]:
+                rows[i] = row
+                changed.add(i)
+
+        self.overflow_report = overflow_summary(rows[:topic_count])
+        return {i for i in changed if rows[i] != previous_rows[i]}
+
+    def _build_calendar(self):
+        """Returns (weeks, total_weeks, revision_weeks_count, study_weeks_limit)."""
+        weeks = self.weeks if self.weeks is not None else build_weeks(self.semester_config)
         
         total_weeks = len(weeks)
         
@@ -79,12 +334,16 @@ class PlannerEngine:
         # We'll set aside the last week(s) for revision
         revision_weeks_count = self.semester_config.get("revision_weeks", 0)
         study_weeks_limit = max(1, total_weeks - revision_weeks_count)
-        
+        return weeks, total_weeks, revision_weeks_count, study_weeks_limit
+
+    def _collect_topics(self):
         # 2. Collect and Sort Topics
         all_topics = []
         for subject in self.subjects:
-            # Get difficulty multiplier from subject or default
-            diff_mult = getattr(subject, 'difficulty_multiplier', 1.0)
+            # Get difficulty multiplier from config (per-student override), subject or default
+            diff_mult = self.semester_config.get(
+                "difficulty_multiplier", getattr(subject, 'difficulty_multiplier', 1.0)
+            )
             
             # Simple heuristic: Units 1-3 are often midterm, 4-6 are final
             # In a better system, this would be explicitly in the JSON
@@ -105,66 +364,54 @@ class PlannerEngine:
         # Sort by priority (Unit No) to ensure logical flow
         # This naturally "front-loads" lower unit numbers (Mid-exams)
         all_topics.sort(key=lambda x: x["priority"])
+        return all_topics
 
-        # 3. Calculate Topics Per Week
-        topics_per_week = max(1, len(all_topics) // study_weeks_limit)
+    def _topic_hours(self, item) -> float:
+        # 4. Weighted Hour Calculation
+        unit = item["unit"]
+        base_hours = unit.minimum_hours or 10
+        topic_count = len(unit.topics)
+        hours_per_topic = (base_hours / topic_count) * item["diff_mult"]
         
-        plan_rows = []
-        current_week = 1
-        count_in_week = 0
+        # Boost hours if unit is marked "IMP"
+        if unit.importance == "IMP":
+            hours_per_topic *= 1.2
+        return hours_per_topic
 
-        for item in all_topics:
-            subj = item["subject"]
-            unit = item["unit"]
-            topic = item["topic"]
-            
-            if count_in_week >= topics_per_week and current_week < study_weeks_limit:
-                current_week += 1
-                count_in_week = 0
+    def _topic_row(self, item, week_no, week_days):
+        subj = item["subject"]
+        unit = item["unit"]
+        topic = item["topic"]
+        return {
+            "subject": subj.name,
+            "unit": unit.unit_no,
+            "unit_title": unit.title,
+            "importance": unit.importance,
+            "topic": topic.topic,
+            "subtopics": topic.subtopics,
+            "self_study": False,
+            "week": week_no,
+            "start_date": week_days[0],
+            "end_date": week_days[-1],
+            "estimated_hours": round(self._topic_hours(item), 1)
+        }
 
-            week_days = weeks[current_week]
-
-            # 4. Weighted Hour Calculation
-            base_hours = unit.minimum_hours or 10
-            topic_count = len(unit.topics)
-            hours_per_topic = (base_hours / topic_count) * item["diff_mult"]
-            
-            # Boost hours if unit is marked "IMP"
-            if unit.importance == "IMP":
-                hours_per_topic *= 1.2
-
-            plan_rows.append({
-                "subject": subj.name,
-                "unit": unit.unit_no,
-                "unit_title": unit.title,
-                "importance": unit.importance,
-                "topic": topic.topic,
-                "subtopics": topic.subtopics,
+    def _revision_rows(self, weeks, study_weeks_limit, total_weeks):
+        # 5. Add Revision Rows for the final weeks
+        rows = []
+        for rw in range(study_weeks_limit + 1, total_weeks + 1):
+            week_days = weeks[rw]
+            rows.append({
+                "subject": REVISION_SUBJECT,
+                "unit": 0,
+                "unit_title": "REVISION CYCLE",
+                "importance": "IMP",
+                "topic": f"Final Revision Cycle - Week {rw}",
+                "subtopics": [],
                 "self_study": False,
-                "week": current_week,
+                "week": rw,
                 "start_date": week_days[0],
                 "end_date": week_days[-1],
-                "estimated_hours": round(hours_per_topic, 1)
+                "estimated_hours": self.semester_config.get("daily_hours", 3) * 5
             })
-
-            count_in_week += 1
-
-        # 5. Add Revision Rows for the final weeks
-        if revision_weeks_count > 0:
-            for rw in range(study_weeks_limit + 1, total_weeks + 1):
-                week_days = weeks[rw]
-                plan_rows.append({
-                    "subject": "ALL SUBJECTS",
-                    "unit": 0,
-                    "unit_title": "REVISION CYCLE",
-                    "importance": "IMP",
-                    "topic": f"Final Revision Cycle - Week {rw}",
-                    "subtopics": [],
-                    "self_study": False,
-                    "week": rw,
-                    "start_date": week_days[0],
-                    "end_date": week_days[-1],
-                    "estimated_hours": self.semester_config.get("daily_hours", 3) * 5
-                })
-
-        return plan_rows
+        return rows
@@ -0,0 +1,64 @@
+import hashlib
+import os
+from typing import Optional, Tuple
+
+from planner.ingestion.ocr import OCREngine
+from planner.ingestion.cleaner import SyllabusCleaner
+from planner.utils.cache import DiskCache
+from planner.utils.logger import setup_logger
+from planner.utils.progress import report
+
+logger = setup_logger(__name__)
+
+class IngestionCache:
+    """
+    Caches OCR + cleaning results keyed by file content and OCR settings,
+    so a document that was already ingested is never OCRed again.
+    """
+
+    # Bump when OCR/cleaning output or the entry format changes so stale entries are ignored
+    # (2: entries are wrapped in DiskCache's {"created", "value"} envelope)
+    VERSION = 2
+
+    def __init__(self, cache_dir: Optional[str] = None, max_mb: Optional[float] = None):
+        # Priority: argument -> environment -> default
+        cache_dir = cache_dir or os.environ.get("INGEST_CACHE_DIR", os.path.join("cache", "ingestion"))
+        if max_mb is None:
+            max_mb = float(os.environ.get("INGEST_CACHE_MAX_MB", 200))
+
+        # A size of 0 disables the cache
+        self.enabled = max_mb > 0
+        self.store = DiskCache(cache_dir, int(max_mb * 1024 * 1024)) if self.enabled else None
+
+    def key_for(self, file_path: str, ocr: OCREngine) -> str:
+        """SHA-256 of the file bytes plus the OCR settings that affect the extracted text."""
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        digest.update(f"|v{self.VERSION}|{ocr.settings_fingerprint()}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def ingest(self, file_path: str, ocr: OCREngine, cleaner: SyllabusCleaner) -> Tuple[str, str]:
+        """
+        Returns (raw_text, clean_text) for a file, running OCR and cleaning only on a cache miss.
+        """
+        if not self.enabled:
+            raw_text = ocr.extract_text(file_path)
+            return raw_text, cleaner.clean(raw_text)
+
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
+
+        key = self.key_for(file_path, ocr)
+        cached = self.store.get(key)
+        if cached is not None:
+            logger.info(f"Ingestion cache hit for {file_path} ({key[:12]}).")
+            report(ocr.progress, "ocr", message="Already ingested, reusing cached text")
+            return cached["raw_text"], cached["clean_text"]
+
+        logger.info(f"Ingestion cache miss for {file_path} ({key[:12]}).")
+        raw_text = ocr.extract_text(file_path)
+        clean_text = cleaner.clean(raw_text)
+        self.store.set(key, {"raw_text": raw_text, "clean_text": clean_text})
+        return raw_text, clean_text
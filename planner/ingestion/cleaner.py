@@ -1,7 +1,8 @@
 import re
 import os
-from typing import List
+from typing import List, Optional
 from planner.utils.logger import setup_logger
+from planner.utils.progress import ProgressCallback, timed_stage
 
 logger = setup_logger(__name__)
 
@@ -10,6 +11,9 @@ class SyllabusCleaner:
     Cleans and normalizes raw text extracted from syllabus documents.
     """
 
+    def __init__(self, progress: Optional[ProgressCallback] = None):
+        self.progress = progress
+
     def clean(self, text: str) -> str:
         """
         Main method to clean text.
@@ -18,10 +22,11 @@ class SyllabusCleaner:
             return ""
 
         logger.info("Starting text cleaning process...")
-        text = self.remove_junk(text)
-        text = self.normalize_bullets(text)
-        text = self.normalize_spacing(text)
-        text = self.preserve_structural_markers(text)
+        with timed_stage(self.progress, "cleaning", f"Cleaning {len(text)} characters"):
+            text = self.remove_junk(text)
+            text = self.normalize_bullets(text)
+            text = self.normalize_spacing(text)
+            text = self.preserve_structural_markers(text)
         
         return text.strip()
 
@@ -1,23 +1,77 @@
 import os
 import mimetypes
-from typing import Optional, Dict, Any
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, Any, Iterator, List
 import pytesseract
 from PIL import Image
 from pdf2image import convert_from_path
 import fitz  # PyMuPDF
 from docx import Document
 from planner.utils.logger import setup_logger
+from planner.utils.progress import ProgressCallback, report, timed_stage
 
 logger = setup_logger(__name__)
 
+def _ocr_page(image, tesseract_cmd: Optional[str] = None) -> str:
+    """
+    Runs Tesseract on a single page image.
+    Lives at module level so it can be pickled into worker processes.
+    """
+    if tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    return pytesseract.image_to_string(image)
+
+def _contiguous_runs(pages: List[int]) -> List[tuple]:
+    """Collapses sorted page numbers into (first, last) ranges, e.g. [1, 2, 3, 7] -> [(1, 3), (7, 7)]."""
+    runs = []
+    for page_no in pages:
+        if runs and page_no == runs[-1][1] + 1:
+            runs[-1] = (runs[-1][0], page_no)
+        else:
+            runs.append((page_no, page_no))
+    return runs
+
 class OCREngine:
     """
     Handles text extraction from various file formats.
     """
 
-    def __init__(self, tesseract_cmd: Optional[str] = None):
+    # Pages with fewer characters than this in their text layer are treated as scanned
+    MIN_PAGE_TEXT_CHARS = 20
+
+    def __init__(self, tesseract_cmd: Optional[str] = None, ocr_workers: Optional[int] = None,
+                 max_pages_in_memory: Optional[int] = None, pdf_ocr_mode: Optional[str] = None,
+                 progress: Optional[ProgressCallback] = None):
         if tesseract_cmd:
             pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+        self.tesseract_cmd = tesseract_cmd
+
+        # Number of processes used to OCR scanned PDF pages (1 = sequential)
+        # Priority: argument -> environment -> CPU count
+        if ocr_workers is None:
+            ocr_workers = int(os.environ.get("OCR_WORKERS", os.cpu_count() or 1))
+        self.ocr_workers = max(1, ocr_workers)
+
+        # Streaming mode: rasterize scanned PDFs in windows of at most this many pages
+        # (0 = render the whole document at once)
+        if max_pages_in_memory is None:
+            max_pages_in_memory = int(os.environ.get("OCR_MAX_PAGES_IN_MEMORY", 0))
+        self.max_pages_in_memory = max(0, max_pages_in_memory)
+
+        # "document": OCR every page when the whole text layer is too short (default)
+        # "per_page": keep usable text layers and OCR only the pages without one
+        self.pdf_ocr_mode = pdf_ocr_mode or os.environ.get("OCR_PDF_MODE", "document")
+        if self.pdf_ocr_mode not in ("document", "per_page"):
+            raise ValueError(f"Unsupported PDF OCR mode: {self.pdf_ocr_mode}")
+
+        self.progress = progress
+
+    def settings_fingerprint(self) -> str:
+        """
+        Identifies the settings that change the extracted text (not just its speed).
+        Used as part of ingestion cache keys.
+        """
+        return f"pdf_ocr_mode={self.pdf_ocr_mode};min_page_chars={self.MIN_PAGE_TEXT_CHARS};tesseract={self.tesseract_cmd or 'default'}"
 
     def detect_file_type(self, file_path: str) -> str:
         """
@@ -48,19 +102,21 @@ class OCREngine:
         file_type = self.detect_file_type(file_path)
         logger.info(f"Detected file type: {file_type} for {file_path}")
 
-        if 'pdf' in file_type:
-            return self._extract_from_pdf(file_path)
-        elif 'wordprocessingml' in file_type or file_path.endswith('.docx'):
-            return self._extract_from_docx(file_path)
-        elif 'image' in file_type:
-            return self._extract_from_image(file_path)
-        else:
-            raise ValueError(f"Unsupported file type: {file_type}")
+        with timed_stage(self.progress, "ocr", f"Reading {os.path.basename(file_path)}"):
+            if 'pdf' in file_type:
+                return self._extract_from_pdf(file_path)
+            elif 'wordprocessingml' in file_type or file_path.endswith('.docx'):
+                return self._extract_from_docx(file_path)
+            elif 'image' in file_type:
+                return self._extract_from_image(file_path)
+            else:
+                raise ValueError(f"Unsupported file type: {file_type}")
 
     def _extract_from_image(self, image_path: str) -> str:
         """Extracts text from an image using Tesseract."""
         try:
             text = pytesseract.image_to_string(Image.open(image_path))
+            report(self.progress, "ocr", message="OCR page 1 of 1", current=1, total=1)
             return text.strip()
         except Exception as e:
             logger.error(f"Error extracting from image: {e}")
@@ -71,28 +127,99 @@ class OCREngine:
         Extracts text from PDF. Tries text layer first, 
         falls back to OCR if text layer is empty or poor quality.
         """
-        text = ""
         try:
             # Try PyMuPDF first (fast, handles text layer)
             doc = fitz.open(pdf_path)
-            for page in doc:
-                text += page.get_text()
+            page_texts = [page.get_text() for page in doc]
             doc.close()
+            report(self.progress, "ocr", message=f"Read text layer of {len(page_texts)} pages")
 
+            if self.pdf_ocr_mode == "per_page":
+                return self._extract_pages_hybrid(pdf_path, page_texts)
+
+            text = "".join(page_texts)
             # If text is very short or looks like junk, try OCR
             if len(text.strip()) < 100:  # Threshold for "empty" or scanned PDF
                 logger.info("PDF text layer is empty or too short. Falling back to OCR.")
-                images = convert_from_path(pdf_path)
-                ocr_text = ""
-                for img in images:
-                    ocr_text += pytesseract.image_to_string(img)
-                return ocr_text.strip()
+                pages = list(range(1, len(page_texts) + 1))
+                return "".join(self._ocr_pdf(pdf_path, pages)).strip()
             
             return text.strip()
         except Exception as e:
             logger.error(f"Error extracting from PDF: {e}")
             raise
 
+    def _extract_pages_hybrid(self, pdf_path: str, page_texts: List[str]) -> str:
+        """
+        Keeps the text layer of pages that have one and OCRs only the pages that don't.
+        """
+        scanned = [
+            page_no for page_no, page_text in enumerate(page_texts, start=1)
+            if len(page_text.strip()) < self.MIN_PAGE_TEXT_CHARS
+        ]
+        if scanned:
+            logger.info(f"{len(scanned)} of {len(page_texts)} PDF pages have no usable text layer. Running OCR on those pages.")
+            for page_no, ocr_text in zip(scanned, self._ocr_pdf(pdf_path, scanned)):
+                page_texts[page_no - 1] = ocr_text
+
+        return "".join(page_texts).strip()
+
+    def _ocr_pdf(self, pdf_path: str, pages: List[int]) -> List[str]:
+        """
+        Rasterizes and OCRs the given (1-based) PDF pages, returning the text per page.
+        In streaming mode only a window of pages is held in memory at a time.
+        """
+        if not pages:
+            # A zero-page PDF (or nothing to OCR): range() below rejects a window of 0
+            return []
+        window = self.max_pages_in_memory or len(pages)
+        if window < len(pages):
+            logger.info(f"Streaming OCR over {len(pages)} pages in windows of {window}.")
+
+        workers = min(self.ocr_workers, window)
+        # One pool for the whole document instead of one per window
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        texts = []
+        try:
+            for start in range(0, len(pages), window):
+                images = []
+                for first, last in _contiguous_runs(pages[start:start + window]):
+                    images.extend(convert_from_path(pdf_path, first_page=first, last_page=last))
+                for text in self._ocr_images(images, pool):
+                    texts.append(text)
+                    report(self.progress, "ocr", message=f"OCR page {len(texts)} of {len(pages)}",
+                           current=len(texts), total=len(pages))
+                # Free the rendered window before rasterizing the next one
+                for img in images:
+                    img.close()
+                del images
+        finally:
+            if pool:
+                pool.shutdown()
+        return texts
+
+    def _ocr_images(self, images: List[Image.Image],
+                    pool: Optional[ProcessPoolExecutor] = None) -> Iterator[str]:
+        """
+        OCRs a list of page images and yields their text in page order as pages finish.
+        Pages are spread across a process pool when more than one worker is configured.
+        """
+        tesseract_cmds = [self.tesseract_cmd] * len(images)
+        if pool:
+            yield from pool.map(_ocr_page, images, tesseract_cmds)
+            return
+
+        workers = min(self.ocr_workers, len(images))
+        if workers <= 1:
+            for img in images:
+                yield _ocr_page(img, self.tesseract_cmd)
+            return
+
+        logger.info(f"Running OCR on {len(images)} pages with {workers} worker processes.")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # map() yields results in submission order, i.e. page order
+            yield from pool.map(_ocr_page, images, tesseract_cmds)
+
     def _extract_from_docx(self, docx_path: str) -> str:
         """Extracts text from a DOCX file."""
         try:
@@ -5,6 +5,7 @@ Defines:
 - Subject
 - Unit
 - Topic
+- UnitDelta
 
 Responsibilities:
 - Represent academic hierarchy
@@ -40,4 +41,17 @@ class Subject:
     credits: int
     exam_weightage: dict
     units: List[Unit]
-    difficulty_multiplier: float = 1.0
\ No newline at end of file
+    difficulty_multiplier: float = 1.0
+
+
+@dataclass
+class UnitDelta:
+    """
+    A change to one unit, used for incremental re-planning.
+    Fields left as None are unchanged. `subject` is the subject code or name.
+    """
+    subject: str
+    unit_no: int
+    minimum_hours: Optional[int] = None
+    importance: Optional[str] = None
+    title: Optional[str] = None
@@ -0,0 +1,135 @@
+"""
+On-disk JSON cache.
+
+Responsibilities:
+- Store JSON-serializable values under a string key, one file per entry
+- Evict least recently used entries once the cache exceeds its size or entry budget
+- Expire entries after an optional time-to-live
+- Count hits and misses
+
+Callers decide what goes into the key (content hashes, settings, model names).
+No OCR, AI or planning logic should appear here.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from planner.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class DiskCache:
+    """
+    A directory of `<key>.json` files with size-based LRU eviction.
+    File modification times double as the LRU clock: reads touch the entry.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int,
+                 ttl_seconds: Optional[float] = None, max_entries: Optional[int] = None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # get() runs on several threads; += on the counters is not atomic
+        self._stats_lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self._read(key)
+        with self._stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def _read(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            value = entry["value"]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Dropping unreadable cache entry {path}: {e}")
+            self.delete(key)
+            return None
+
+        if self.ttl_seconds is not None and time.time() - entry.get("created", 0) > self.ttl_seconds:
+            self.delete(key)
+            return None
+
+        try:
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            pass
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]):
+        # Write to a temp file and rename so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"created": time.time(), "value": value}, f)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._evict()
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        """Removes least recently used entries until the cache fits its size and entry limits."""
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.cache_dir):
+                if not entry.name.endswith(".json"):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+            count = len(entries)
+            if total <= self.max_bytes and (self.max_entries is None or count <= self.max_entries):
+                return
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes and (self.max_entries is None or count <= self.max_entries):
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                count -= 1
+            logger.info(f"Cache {self.cache_dir} evicted down to {count} entries / {total} bytes.")
@@ -5,14 +5,21 @@ Responsibilities:
 - Generate date ranges
 - Exclude rest days
 - Group study days into relative semester weeks
+- Build memoized, vectorized (NumPy) calendars for batch planning
+- Exclude holiday / exam-blackout date ranges via a sorted interval index
 
 This file defines what 'time' means in the planner.
 No syllabus or Excel logic should appear here.
 """
 
 
-from datetime import date, timedelta
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
 from collections import defaultdict
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
 
 #timedelta move forward 1 day at a time
 #defaultdict: no constant key checks required
@@ -44,10 +51,176 @@ def group_days_by_week(study_days: list[date]):
 
     weeks=defaultdict(list)
     week_no=1
+    current_monday=None
 
     for d in study_days:
-        if weeks[week_no] and d.weekday() == 0:
+        # A new week starts whenever the calendar week changes, even if its Monday
+        # is a rest day or holiday
+        monday = d - timedelta(days=d.weekday())
+        if weeks[week_no] and monday != current_monday:
             week_no += 1
+        current_monday = monday
         weeks[week_no].append(d)
 
     return dict(weeks)
+
+
+WEEKDAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+class DateIntervalIndex:
+    """
+    Sorted, merged, non-overlapping [start, end] date ranges (both ends inclusive).
+    Lookups are a binary search, so hundreds of holidays/blackouts stay O(log n).
+    """
+
+    def __init__(self, intervals: list[tuple]):
+        merged = []
+        for lo, hi in sorted(intervals):
+            # Overlapping or back-to-back ranges become one
+            if merged and lo <= merged[-1][1] + timedelta(days=1):
+                merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+            else:
+                merged.append((lo, hi))
+        self.intervals = tuple(merged)
+        self._starts = [lo for lo, _ in merged]
+        self._np_starts = np.array(self._starts, dtype="datetime64[D]")
+        self._np_ends = np.array([hi for _, hi in merged], dtype="datetime64[D]")
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def __contains__(self, d: date) -> bool:
+        i = bisect_right(self._starts, d) - 1
+        return i >= 0 and d <= self.intervals[i][1]
+
+    def mask(self, days: np.ndarray) -> np.ndarray:
+        """Vectorized membership test for a datetime64[D] array."""
+        if not len(self.intervals):
+            return np.zeros(len(days), dtype=bool)
+        i = np.searchsorted(self._np_starts, days, side="right") - 1
+        return (i >= 0) & (days <= self._np_ends[np.maximum(i, 0)])
+
+
+def _parse_date(value) -> date:
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def exclusion_index(*range_lists) -> DateIntervalIndex:
+    """
+    Builds one index from semester config entries such as
+    ["2026-01-26", {"start": "2026-03-02", "end": "2026-03-08", "name": "Midterms"}].
+    A bare date or a missing "end" means a single day.
+    """
+    intervals = []
+    for ranges in range_lists:
+        for r in ranges or []:
+            if isinstance(r, dict):
+                lo = _parse_date(r["start"])
+                hi = _parse_date(r.get("end") or r["start"])
+            else:
+                lo = hi = _parse_date(r)
+            intervals.append((min(lo, hi), max(lo, hi)))
+    return _exclusion_index(tuple(intervals))
+
+
+@lru_cache(maxsize=256)
+def _exclusion_index(intervals: tuple) -> DateIntervalIndex:
+    return DateIntervalIndex(list(intervals))
+
+
+def build_calendar(start: date, end: date, rest_days: list[str],
+                   exclusions: Optional[DateIntervalIndex] = None):
+    """
+    Vectorized equivalent of generate_study_days + group_days_by_week.
+
+    Returns (study_days, week_index): a datetime64[D] array of study dates and the
+    matching 1-based week numbers. Dates inside `exclusions` (holidays, exam
+    blackouts) are not study days. Results are memoized per
+    (start, end, rest_days, exclusions) and returned read-only, so don't modify
+    them in place.
+    """
+    excluded = exclusions.intervals if exclusions else ()
+    return _build_calendar(start, end, tuple(sorted(set(rest_days))), excluded)
+
+
+@lru_cache(maxsize=1024)
+def _build_calendar(start: date, end: date, rest_days: tuple, excluded: tuple = ()):
+    # weekmask in busday order: Monday ... Sunday, 1 = study day
+    weekmask = [0 if day in rest_days else 1 for day in WEEKDAY_NAMES]
+
+    if end < start or not any(weekmask):
+        study_days = np.array([], dtype="datetime64[D]")
+    else:
+        days = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1)
+        study_days = days[np.is_busday(days, weekmask=weekmask)]
+        if excluded:
+            study_days = study_days[~_exclusion_index(excluded).mask(study_days)]
+
+    # Same rule as group_days_by_week: a new week starts whenever the Monday of a
+    # study day's calendar week differs from the previous study day's, so weeks
+    # whose Monday is excluded don't merge. 1970-01-01 (day 0) was a Thursday.
+    ordinal = study_days.astype("int64")
+    monday = ordinal - (ordinal + 3) % 7
+    new_week = np.empty(len(monday), dtype=bool)
+    new_week[:1] = False
+    new_week[1:] = monday[1:] != monday[:-1]
+    week_index = 1 + np.cumsum(new_week)
+
+    study_days.flags.writeable = False
+    week_index.flags.writeable = False
+    return study_days, week_index
+
+
+def is_study_day(calendar, d: date) -> bool:
+    """O(log n) lookup in a (study_days, week_index) calendar from build_calendar."""
+    study_days, _ = calendar
+    target = np.datetime64(d, "D")
+    i = np.searchsorted(study_days, target)
+    return bool(i < len(study_days) and study_days[i] == target)
+
+
+def week_of(calendar, d: date) -> Optional[int]:
+    """
+    O(log n) week number for a date in a build_calendar calendar. Non-study days
+    (rest days, holidays) belong to the week of the last study day before them.
+    Returns None before the first study day.
+    """
+    study_days, week_index = calendar
+    i = np.searchsorted(study_days, np.datetime64(d, "D"), side="right") - 1
+    return int(week_index[i]) if i >= 0 else None
+
+
+def study_weeks(start: date, end: date, rest_days: list[str],
+                exclusions: Optional[DateIntervalIndex] = None):
+    """
+    Returns {week_no: [dates]} like group_days_by_week(generate_study_days(...)),
+    built from the memoized NumPy calendar.
+    """
+    study_days, week_index = build_calendar(start, end, rest_days, exclusions)
+    if not len(study_days):
+        return {}
+
+    dates = study_days.tolist()
+    # Positions where the week number changes split the days into weeks
+    bounds = [0, *(np.flatnonzero(np.diff(week_index)) + 1).tolist(), len(dates)]
+    return {
+        int(week_index[lo]): dates[lo:hi]
+        for lo, hi in zip(bounds, bounds[1:])
+    }
+
+
+if __name__ == "__main__":
+    # Regression check: an excluded Monday (a holiday here) must not merge two weeks
+    start, end = date(2026, 1, 19), date(2026, 2, 15)
+    holidays = exclusion_index(["2026-01-26"])
+    weeks = study_weeks(start, end, ["Sunday"], holidays)
+    expected = group_days_by_week(
+        [d for d in generate_study_days(start, end, ["Sunday"]) if d not in holidays]
+    )
+    assert weeks == expected, (weeks, expected)
+    assert [len(days) for days in weeks.values()] == [6, 5, 6, 6], weeks
+    assert week_of(build_calendar(start, end, ["Sunday"], holidays), date(2026, 1, 27)) == 2
+    print(f"{len(weeks)} weeks: " + ", ".join(f"{w}: {d[0]} -> {d[-1]}" for w, d in weeks.items()))
@@ -0,0 +1,164 @@
+"""
+Background job queue.
+
+Responsibilities:
+- Accept pipeline work as jobs and hand back an ID immediately
+- Run jobs on a bounded pool of asyncio workers
+- Track status, current stage, result and error per job
+- Keep an ordered log of progress events per job for streaming to clients
+- Refuse new work when the queue is full (backpressure)
+
+Jobs are plain async callables; what they do (OCR, AI, planning) is up to the caller.
+"""
+
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from planner.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    status: str = "queued"  # queued / running / done / failed
+    stage: Optional[str] = None
+    stages: List[Dict[str, Any]] = field(default_factory=list)
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    result: Any = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    # Pulls in events still buffered elsewhere (e.g. from worker processes) so stage
+    # boundaries land after them in the event log
+    flush_events: Optional[Callable[[], None]] = field(default=None, repr=False)
+
+    def set_stage(self, stage: str):
+        """Marks the start of a pipeline stage and closes the previous one."""
+        now = time.time()
+        self._close_stage(now)
+        self.stage = stage
+        self.stages.append({"stage": stage, "started_at": now, "finished_at": None})
+        self.add_event({"stage": stage, "event": "started", "message": "", "time": now})
+
+    def _close_stage(self, now: float):
+        if self.flush_events:
+            self.flush_events()
+        if self.stages and self.stages[-1]["finished_at"] is None:
+            current = self.stages[-1]
+            current["finished_at"] = now
+            self.add_event({
+                "stage": current["stage"], "event": "finished", "message": "", "time": now,
+                "elapsed": round(now - current["started_at"], 3),
+            })
+
+    def add_event(self, event: Dict[str, Any]):
+        self.events.append({"job_id": self.id, **event})
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "stages": self.stages,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    Bounded asyncio job queue with a fixed number of workers.
+    Finished jobs are kept for polling until `max_retained` newer jobs push them out.
+    """
+
+    def __init__(self, workers: int = 2, max_queued: int = 20, max_retained: int = 1000):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.max_retained = max_retained
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Job manager started with {self.workers} workers (queue size {self.max_queued}).")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, kind: str, fn: Callable[[Job], Awaitable[Any]]) -> Job:
+        """
+        Queues fn(job) and returns the job right away.
+        Raises QueueFullError when max_queued jobs are already waiting.
+        """
+        job = Job(id=str(uuid.uuid4()), kind=kind)
+        try:
+            self._queue.put_nowait((job, fn))
+        except asyncio.QueueFull:
+            raise QueueFullError(f"Job queue is full ({self.max_queued} waiting).")
+
+        self.jobs[job.id] = job
+        self._trim()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in self.jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {"workers": self.workers, "queued": self._queue.qsize() if self._queue else 0, **counts}
+
+    async def _worker(self, worker_no: int):
+        while True:
+            job, fn = await self._queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                job.result = await fn(job)
+                job.status = "done"
+            except Exception as e:
+                logger.exception(f"Job {job.id} ({job.kind}) failed")
+                job.error = getattr(e, "detail", None) or str(e)
+                job.status = "failed"
+            finally:
+                job.finished_at = time.time()
+                job._close_stage(job.finished_at)
+                self._queue.task_done()
+
+    def _trim(self):
+        """Forgets the oldest finished jobs beyond max_retained."""
+        excess = len(self.jobs) - self.max_retained
+        if excess <= 0:
+            return
+        for job_id in list(self.jobs):
+            if excess <= 0:
+                break
+            if self.jobs[job_id].finished:
+                del self.jobs[job_id]
+                excess -= 1
@@ -0,0 +1,124 @@
+"""
+Content-addressed store for generated plans.
+
+Responsibilities:
+- Key plan outputs by a hash of the refined syllabus and semester config
+- Keep one copy of each artifact (JSON, xlsx, csv, ...) per key
+- Materialize output versions as hardlinks into the store (copies as fallback)
+- Drop entries no version points to any more
+- Serialize adding, linking and collection with one cross-process lock
+
+Identical inputs therefore skip planning and writing entirely; a new version is
+just a directory of links.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from planner.utils.logger import setup_logger
+from planner.utils.versions import locked_file
+
+logger = setup_logger(__name__)
+
+LOCK_FILE = ".lock"
+
+# flock is per open file; this keeps threads of one process from contending on it
+_thread_lock = threading.Lock()
+
+
+class PlanStore:
+    """
+    Files live in <root>/<key[:2]>/<key>/<name>. Files are added atomically with
+    os.replace, so concurrent writers of the same key are harmless. Hold locked()
+    around add + link so gc() cannot collect an entry in between.
+    """
+
+    # Bump when planning or writer output changes so old entries are not reused
+    VERSION = 2
+
+    def __init__(self, root: Optional[str] = None, enabled: Optional[bool] = None):
+        # Priority: argument -> environment -> default
+        self.root = root or os.environ.get(
+            "PLAN_STORE_DIR", os.path.join(os.environ.get("OUTPUT_DIR", "output"), ".store")
+        )
+        if enabled is None:
+            enabled = os.environ.get("PLAN_DEDUP", "true").lower() in ("1", "true", "yes")
+        self.enabled = enabled
+
+    def key_for(self, refined_data: Dict[str, Any], semester_config: Dict[str, Any]) -> str:
+        """SHA-256 of the refined syllabus and the resolved semester config (dates included)."""
+        payload = json.dumps(
+            {"v": self.VERSION, "syllabus": refined_data, "semester": semester_config},
+            sort_keys=True, default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @contextmanager
+    def locked(self):
+        """Exclusive lock on the store, shared with gc() in every process."""
+        os.makedirs(self.root, exist_ok=True)
+        with _thread_lock, locked_file(os.path.join(self.root, LOCK_FILE)):
+            yield
+
+    def entry_dir(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def missing(self, key: str, names: List[str]) -> List[str]:
+        entry = self.entry_dir(key)
+        return [name for name in names if not os.path.exists(os.path.join(entry, name))]
+
+    def staging_dir(self) -> str:
+        """A scratch directory on the store's filesystem, so add() can rename files in."""
+        os.makedirs(self.root, exist_ok=True)
+        return tempfile.mkdtemp(prefix=".staging_", dir=self.root)
+
+    def add(self, key: str, files: Dict[str, str]):
+        """Moves {name: path} into the entry for `key`."""
+        entry = self.entry_dir(key)
+        os.makedirs(entry, exist_ok=True)
+        for name, path in files.items():
+            os.replace(path, os.path.join(entry, name))
+
+    def link(self, key: str, names: List[str], dest_dir: str) -> Dict[str, str]:
+        """Hardlinks the named files of an entry into dest_dir, copying where links aren't possible."""
+        entry = self.entry_dir(key)
+        paths = {}
+        for name in names:
+            src = os.path.join(entry, name)
+            dst = os.path.join(dest_dir, name)
+            try:
+                os.link(src, dst)
+            except OSError:
+                shutil.copy2(src, dst)
+            paths[name] = dst
+        return paths
+
+    def gc(self) -> int:
+        """
+        Removes entries none of whose files are linked from a version any more.
+        Versions that had to copy instead of link don't count as references; their
+        copies stay intact, only the deduplication for those inputs is lost.
+        """
+        removed = 0
+        if not os.path.isdir(self.root):
+            return 0
+        with self.locked():
+            for shard in os.listdir(self.root):
+                shard_dir = os.path.join(self.root, shard)
+                if shard.startswith(".") or not os.path.isdir(shard_dir):
+                    continue
+                for key in os.listdir(shard_dir):
+                    entry = os.path.join(shard_dir, key)
+                    files = [os.path.join(entry, name) for name in os.listdir(entry)]
+                    if all(os.stat(f).st_nlink <= 1 for f in files):
+                        shutil.rmtree(entry, ignore_errors=True)
+                        removed += 1
+        if removed:
+            logger.info(f"Removed {removed} unreferenced plans from the store.")
+        return removed
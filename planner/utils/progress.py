@@ -0,0 +1,60 @@
+"""
+Progress reporting helpers.
+
+Responsibilities:
+- Define the shape of progress events emitted by pipeline components
+- Time pipeline stages
+- Forward events across process boundaries
+
+A progress callback is any callable taking one event dict. Components accept
+`progress=None` and stay silent without one.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+
+def report(progress: Optional[ProgressCallback], stage: str, event: str = "progress",
+           message: str = "", **fields):
+    """Sends one event, e.g. report(cb, "ocr", message="page 3 of 20", current=3, total=20)."""
+    if progress is None:
+        return
+    progress({"stage": stage, "event": event, "message": message, "time": time.time(), **fields})
+
+
+@contextmanager
+def timed_stage(progress: Optional[ProgressCallback], stage: str, message: str = ""):
+    """
+    Emits `started` and `finished` events around a block, with the elapsed seconds.
+    If the block raises, the closing event is `failed` and carries the error instead.
+    """
+    start = time.perf_counter()
+    report(progress, stage, "started", message)
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        elapsed = round(time.perf_counter() - start, 3)
+        if error is None:
+            report(progress, stage, "finished", elapsed=elapsed)
+        else:
+            report(progress, stage, "failed", message=f"{type(error).__name__}: {error}", elapsed=elapsed)
+
+
+class QueueReporter:
+    """
+    Progress callback that puts events on a queue.
+    With a multiprocessing.Manager queue it can be pickled into worker processes.
+    """
+
+    def __init__(self, queue):
+        self.queue = queue
+
+    def __call__(self, event: Dict[str, Any]):
+        self.queue.put(event)
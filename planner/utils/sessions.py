@@ -0,0 +1,227 @@
+"""
+Session storage for the web API.
+
+Responsibilities:
+- Hold per-upload session data between /upload and /refine
+- Bound memory/disk use with LRU + TTL eviction and byte accounting
+- Notify the caller about evicted sessions so it can delete their temp files
+
+Two backends share one interface:
+- InMemorySessionStore: fastest, single process only
+- SQLiteSessionStore: one database file, shared across uvicorn workers
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from planner.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+EvictCallback = Callable[[str, Dict[str, Any]], None]
+
+
+class SessionStore:
+    """
+    Interface for session backends.
+    Values are JSON-serializable dicts; mutate a copy and `set` it back to persist changes.
+    """
+
+    def __init__(self, ttl_seconds: float, max_sessions: int, max_bytes: int,
+                 on_evict: Optional[EvictCallback] = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def set(self, session_id: str, data: Dict[str, Any]):
+        raise NotImplementedError
+
+    def delete(self, session_id: str):
+        raise NotImplementedError
+
+    def purge_expired(self) -> int:
+        """Evicts sessions idle for longer than the TTL. Returns how many were removed."""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def _evicted(self, evicted: List[Tuple[str, Dict[str, Any]]]):
+        for session_id, data in evicted:
+            logger.info(f"Evicted session {session_id}.")
+            if self.on_evict:
+                try:
+                    self.on_evict(session_id, data)
+                except Exception as e:
+                    logger.warning(f"Cleanup for evicted session {session_id} failed: {e}")
+
+
+class InMemorySessionStore(SessionStore):
+    """LRU-ordered dict of sessions, sized by their JSON encoding."""
+
+    def __init__(self, ttl_seconds: float, max_sessions: int, max_bytes: int,
+                 on_evict: Optional[EvictCallback] = None):
+        super().__init__(ttl_seconds, max_sessions, max_bytes, on_evict)
+        # session_id -> (data, size_bytes, last_access)
+        self._sessions: "OrderedDict[str, Tuple[Dict[str, Any], int, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        self.purge_expired()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            data, size, _ = entry
+            self._sessions[session_id] = (data, size, time.time())
+            self._sessions.move_to_end(session_id)
+            return data
+
+    def set(self, session_id: str, data: Dict[str, Any]):
+        size = len(json.dumps(data, default=str))
+        evicted = []
+        with self._lock:
+            old = self._sessions.pop(session_id, None)
+            if old:
+                self._bytes -= old[1]
+            self._sessions[session_id] = (data, size, time.time())
+            self._bytes += size
+
+            # Evict least recently used, but never the session just written
+            while len(self._sessions) > 1 and (
+                len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes
+            ):
+                old_id, (old_data, old_size, _) = self._sessions.popitem(last=False)
+                self._bytes -= old_size
+                evicted.append((old_id, old_data))
+        self._evicted(evicted)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            if entry:
+                self._bytes -= entry[1]
+        if entry:
+            self._evicted([(session_id, entry[0])])
+
+    def purge_expired(self) -> int:
+        cutoff = time.time() - self.ttl_seconds
+        evicted = []
+        with self._lock:
+            # Oldest access first, so stop at the first live session
+            while self._sessions:
+                session_id, (data, size, last_access) = next(iter(self._sessions.items()))
+                if last_access >= cutoff:
+                    break
+                self._sessions.popitem(last=False)
+                self._bytes -= size
+                evicted.append((session_id, data))
+        self._evicted(evicted)
+        return len(evicted)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "memory", "sessions": len(self._sessions), "bytes": self._bytes,
+                "max_sessions": self.max_sessions, "max_bytes": self.max_bytes}
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions in a SQLite table; safe to share between processes."""
+
+    def __init__(self, db_path: str, ttl_seconds: float, max_sessions: int, max_bytes: int,
+                 on_evict: Optional[EvictCallback] = None):
+        super().__init__(ttl_seconds, max_sessions, max_bytes, on_evict)
+        self.db_path = db_path
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "id TEXT PRIMARY KEY, data TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_last_access ON sessions(last_access)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # A short-lived connection per call keeps this usable from any thread
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        self.purge_expired()
+        with self._connect() as conn:
+            row = conn.execute("SELECT data FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE sessions SET last_access = ? WHERE id = ?", (time.time(), session_id))
+        return json.loads(row[0])
+
+    def set(self, session_id: str, data: Dict[str, Any]):
+        payload = json.dumps(data, default=str)
+        evicted = []
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, data, size, last_access) VALUES (?, ?, ?, ?)",
+                (session_id, payload, len(payload), time.time()),
+            )
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM sessions").fetchone()
+            if count > self.max_sessions or total > self.max_bytes:
+                rows = conn.execute(
+                    "SELECT id, data, size FROM sessions WHERE id != ? ORDER BY last_access",
+                    (session_id,),
+                ).fetchall()
+                for old_id, old_data, old_size in rows:
+                    if count <= self.max_sessions and total <= self.max_bytes:
+                        break
+                    conn.execute("DELETE FROM sessions WHERE id = ?", (old_id,))
+                    count -= 1
+                    total -= old_size
+                    evicted.append((old_id, json.loads(old_data)))
+        self._evicted(evicted)
+
+    def delete(self, session_id: str):
+        with self._connect() as conn:
+            row = conn.execute("SELECT data FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+        if row:
+            self._evicted([(session_id, json.loads(row[0]))])
+
+    def purge_expired(self) -> int:
+        cutoff = time.time() - self.ttl_seconds
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id, data FROM sessions WHERE last_access < ?", (cutoff,)).fetchall()
+            conn.execute("DELETE FROM sessions WHERE last_access < ?", (cutoff,))
+        self._evicted([(session_id, json.loads(data)) for session_id, data in rows])
+        return len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM sessions").fetchone()
+        return {"backend": "sqlite", "sessions": count, "bytes": total,
+                "max_sessions": self.max_sessions, "max_bytes": self.max_bytes}
+
+
+def create_session_store(on_evict: Optional[EvictCallback] = None) -> SessionStore:
+    """Builds the store configured by the SESSION_* environment variables."""
+    backend = os.environ.get("SESSION_BACKEND", "memory")
+    ttl_seconds = float(os.environ.get("SESSION_TTL_MINUTES", 120)) * 60
+    max_sessions = int(os.environ.get("SESSION_MAX_COUNT", 500))
+    max_bytes = int(float(os.environ.get("SESSION_MAX_MB", 100)) * 1024 * 1024)
+
+    if backend == "sqlite":
+        db_path = os.environ.get("SESSION_DB_PATH", os.path.join("temp", "sessions.db"))
+        return SQLiteSessionStore(db_path, ttl_seconds, max_sessions, max_bytes, on_evict)
+    if backend == "memory":
+        return InMemorySessionStore(ttl_seconds, max_sessions, max_bytes, on_evict)
+    raise ValueError(f"Unsupported session backend: {backend}")
@@ -0,0 +1,184 @@
+"""
+Output version allocation.
+
+Responsibilities:
+- Hand out output/vN directories in constant time
+- Never give the same version to two callers (threads, processes, uvicorn workers)
+- Prune old versions according to a retention policy, once a new one is complete
+
+The next number lives in a counter file guarded by an exclusive file lock, and
+each version directory is created with an exclusive mkdir. The directory
+listing is only read once, to seed the counter for an existing output folder.
+
+Retention only counts versions marked complete, and a version still being written
+is never pruned, however many newer versions are allocated meanwhile.
+"""
+
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+
+from planner.utils.logger import setup_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = setup_logger(__name__)
+
+COUNTER_FILE = ".next_version"
+# Written into a version directory once all of its outputs are in place
+COMPLETE_MARKER = ".complete"
+
+# flock is per open file, so threads of one process are covered too; this just
+# avoids spinning on the OS lock
+_thread_lock = threading.Lock()
+
+
+@contextmanager
+def locked_file(path: str):
+    """
+    Opens (creating) a file and holds an exclusive, cross-process lock on it.
+    Yields the file descriptor. Used for the version counter and the plan store.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        try:
+            yield fd
+        finally:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    finally:
+        os.close(fd)
+
+
+def _version_number(name: str) -> Optional[int]:
+    if name.startswith("v") and name[1:].isdigit():
+        return int(name[1:])
+    return None
+
+
+class VersionAllocator:
+    """
+    Allocates output/v1, output/v2, ... atomically.
+    With `keep` > 0 only the newest `keep` complete versions are retained; call
+    complete() when a version's outputs are written.
+    """
+
+    # Unfinished versions untouched for this long are treated as abandoned (crashed runs)
+    STALE_SECONDS = 24 * 60 * 60
+
+    def __init__(self, base_dir: Optional[str] = None, keep: Optional[int] = None,
+                 on_prune: Optional[Callable[[List[str]], None]] = None):
+        # Priority: argument -> environment -> default
+        self.base_dir = base_dir or os.environ.get("OUTPUT_DIR", "output")
+        if keep is None:
+            keep = int(os.environ.get("OUTPUT_KEEP_VERSIONS", 0))
+        # 0 keeps every version
+        self.keep = max(0, keep)
+        # Called with the removed directories, e.g. to release what they pointed to
+        self.on_prune = on_prune
+
+    def versions(self) -> List[int]:
+        """Existing version numbers, ascending. Lists the directory; not used on the hot path."""
+        if not os.path.isdir(self.base_dir):
+            return []
+        numbers = (_version_number(name) for name in os.listdir(self.base_dir))
+        return sorted(n for n in numbers if n is not None)
+
+    def allocate(self) -> str:
+        """Creates and returns the next version directory, e.g. output/v7."""
+        os.makedirs(self.base_dir, exist_ok=True)
+        with _thread_lock, locked_file(os.path.join(self.base_dir, COUNTER_FILE)) as fd:
+            raw = os.read(fd, 32).strip()
+            if raw.isdigit():
+                number = int(raw)
+            else:
+                # First run on this folder (or a damaged counter): seed it from what exists
+                existing = self.versions()
+                number = existing[-1] + 1 if existing else 1
+
+            while True:
+                version_dir = self._dir(number)
+                try:
+                    os.mkdir(version_dir)
+                    break
+                except FileExistsError:
+                    # Created outside the allocator (e.g. by hand); skip past it
+                    number += 1
+
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            os.write(fd, str(number + 1).encode("ascii"))
+        return version_dir
+
+    def complete(self, version_dir: str) -> List[str]:
+        """
+        Marks version_dir as finished, then prunes older versions.
+        Returns the removed directories.
+        """
+        with open(os.path.join(version_dir, COMPLETE_MARKER), "w"):
+            pass
+        return self.prune()
+
+    def prune(self) -> List[str]:
+        """
+        Deletes complete (or abandoned) versions older than the newest `keep` complete ones.
+        Returns the removed directories.
+        """
+        if not self.keep:
+            return []
+        os.makedirs(self.base_dir, exist_ok=True)
+        with _thread_lock, locked_file(os.path.join(self.base_dir, COUNTER_FILE)):
+            removed = self._prune_locked()
+        self._pruned(removed)
+        return removed
+
+    def _prune_locked(self) -> List[str]:
+        """Applies the retention policy. Call with the counter lock held."""
+        existing = self.versions()
+        complete = [n for n in existing if os.path.exists(os.path.join(self._dir(n), COMPLETE_MARKER))]
+        if len(complete) <= self.keep:
+            return []
+        cutoff = complete[-self.keep]
+        done = set(complete)
+
+        removed = []
+        for number in existing:
+            if number >= cutoff:
+                break
+            path = self._dir(number)
+            if number not in done and not self._abandoned(path):
+                # Still being written by another request
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(path)
+        return removed
+
+    def _dir(self, number: int) -> str:
+        return os.path.join(self.base_dir, f"v{number}")
+
+    def _abandoned(self, path: str) -> bool:
+        try:
+            return time.time() - os.path.getmtime(path) > self.STALE_SECONDS
+        except FileNotFoundError:
+            return False
+
+    def _pruned(self, removed: List[str]):
+        if removed:
+            logger.info(f"Pruned {len(removed)} old output versions (keeping {self.keep}).")
+            if self.on_prune:
+                self.on_prune(removed)
@@ -0,0 +1,46 @@
+"""
+CSV output generation.
+
+Responsibilities:
+- Stream planning rows to a flat CSV file, one row per plan row
+- Keep a stable column order for analytics jobs
+
+No workbook, no styling; rows are written as they are read.
+"""
+
+import csv
+from typing import Any, Dict, Iterable
+
+from planner.utils.progress import timed_stage
+
+COLUMNS = [
+    "subject",
+    "unit",
+    "unit_title",
+    "importance",
+    "topic",
+    "subtopics",
+    "self_study",
+    "week",
+    "start_date",
+    "end_date",
+    "estimated_hours",
+    "overflow_hours",
+]
+
+
+class CsvWriter:
+
+    def __init__(self, progress=None):
+        self.progress = progress
+
+    def write(self, rows: Iterable[Dict[str, Any]], path: str):
+        with timed_stage(self.progress, "csv", "Writing CSV"):
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=COLUMNS, extrasaction="ignore")
+                writer.writeheader()
+                for row in rows:
+                    subtopics = row.get("subtopics")
+                    if isinstance(subtopics, list):
+                        row = {**row, "subtopics": "; ".join(subtopics)}
+                    writer.writerow(row)
@@ -6,36 +6,121 @@ Responsibilities:
 - Apply formatting and styling
 - Render planning rows into Excel layout
 - Handle metadata and presentation details
+- Stream large workbooks with a write-only, single-pass mode
+- Render subject sheets in parallel worker processes and stitch them together
 
 No planning or date logic should live here.
 If Excel looks wrong but logic is right, debug here.
 """
 
 
+import os
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import openpyxl
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, Border, Side
+from openpyxl.worksheet.cell_range import CellRange
+
+from planner.engine.planner_engine import overflow_summary
+from planner.utils.logger import setup_logger
+from planner.utils.progress import report, timed_stage
+from planner.writers.grouping import partition_by_subject
 
 import socket
 
+logger = setup_logger(__name__)
+
+SUBJECT_HEADERS = [
+    "Unit",
+    "Chapter",
+    "Importance",
+    "Week",
+    "Start Date",
+    "End Date",
+    "Topic",
+    "Estimated Hours"
+]
+
+# Part name of the only sheet in a worker-rendered workbook
+WORKER_SHEET_PART = "xl/worksheets/sheet1.xml"
+
+# Stitching relies on openpyxl's package layout; other versions render serially
+STITCH_OPENPYXL = "3.1."
+
+
+def _render_subject_workbook(subject_name: str, rows: list[dict], path: str):
+    """
+    Renders one subject into a single-sheet workbook at `path`.
+    Runs in a worker process; the sheet XML is later stitched into the final workbook.
+    """
+    writer = ExcelWriter(streaming=True, workers=1, shared_styles=True)
+    writer.write_subject_sheet(subject_name, rows)
+    writer.wb.save(path)
+
+
 class ExcelWriter:
 
-    def __init__(self):
-        self.wb=Workbook()
+    def __init__(self, progress=None, streaming: Optional[bool] = None,
+                 workers: Optional[int] = None, shared_styles: bool = False):
+        # Streaming mode: write-only workbook, rows go straight to disk as they're appended,
+        # so memory stays flat for cohort-sized or many-subject plans
+        # Priority: argument -> environment -> default (off)
+        if streaming is None:
+            streaming = os.environ.get("EXCEL_STREAMING", "false").lower() in ("1", "true", "yes")
+        self.streaming = streaming
+
+        # Processes used by write_plan to render subject sheets (1 = in this process)
+        # Priority: argument -> environment -> default (1)
+        if workers is None:
+            workers = int(os.environ.get("EXCEL_WORKERS", 1))
+        self.workers = max(1, workers)
+
+        self.wb=Workbook(write_only=streaming)
+        self.progress=progress
+
+        # Sheets rendered by worker processes: [(placeholder worksheet, worker workbook path)]
+        self._stitched = []
+        self._tmp_dir = None
+        # (rows, subjects) of a parallel write_plan, to re-render serially if stitching fails
+        self._plan = None
+        if shared_styles or self.workers > 1:
+            self._register_shared_styles()
+
+    def _register_shared_styles(self):
+        """
+        Registers every style the subject sheets use, in a fixed order, before any cell
+        is written. Worker workbooks and the final workbook then share identical style
+        tables, so a sheet's style ids stay valid when it is moved between them.
+        """
+        ws = self.wb.create_sheet(title="_styles")
+        thin = Side(style="thin")
+        header = WriteOnlyCell(ws)
+        header.font = Font(bold=True)
+        date_cell = WriteOnlyCell(ws)
+        date_cell.number_format = "yyyy-mm-dd"
+        self_study = WriteOnlyCell(ws)
+        self_study.font = Font(bold=True)
+        self_study.border = Border(top=thin, bottom=thin)
+        for cell in (header, date_cell, self_study):
+            cell.style_id  # adds the cell format to the workbook's table
+        self.wb.remove(ws)
 
 
     def write_subject_sheet(self, subject_name: str, rows: list[dict]):
+        report(self.progress, "excel", message=f"Writing sheet '{subject_name}' ({len(rows)} rows)")
         ws = self.wb.create_sheet(title=subject_name[:31])
 
-        headers = [
-            "Unit",
-            "Chapter",
-            "Importance",
-            "Week",
-            "Start Date",
-            "End Date",
-            "Topic",
-            "Estimated Hours"
-        ]
+        if self.streaming:
+            self._stream_subject_sheet(ws, rows)
+            return
+
+        headers = SUBJECT_HEADERS
 
         ws.append(headers)
 
@@ -52,6 +137,20 @@ class ExcelWriter:
         #         row["minimum_hours"] or ""
         #     ])
 
+        for values in self._sheet_rows(rows):
+            ws.append(values)
+
+        for col in ["E", "F"]:  # Start Date, End Date
+            for cell in ws[col][1:]:
+                cell.number_format = "yyyy-mm-dd"
+
+
+        self._apply_unit_separators(ws)
+        self._merge_units(ws)
+
+
+    def _sheet_rows(self, rows: list[dict]):
+        """Yields the cell values of a subject sheet, row by row (header excluded)."""
         self_study_written = set()
 
         for row in rows:
@@ -60,7 +159,7 @@ class ExcelWriter:
             # NORMAL TOPICS
             # NORMAL TOPICS
             if not row.get("self_study", False):
-                ws.append([
+                yield [
                     row["unit"],
                     row["unit_title"],
                     row["importance"],
@@ -69,42 +168,86 @@ class ExcelWriter:
                     row["end_date"],
                     row["topic"],
                     row["estimated_hours"] or ""
-                ])
+                ]
                 continue
 
 
             # SELF STUDY HEADER (once per unit)
             if row["topic"] == "SELF STUDY" and unit not in self_study_written:
                 # SELF STUDY ITEMS
-                ws.append([
+                yield [
                     "", "", "",
                     row["week"],
                     row["start_date"],
                     row["end_date"],
                     row["topic"],
                     ""
-                ])
+                ]
 
                 self_study_written.add(unit)
                 # continue
 
             # SELF STUDY ITEMS (below header, Topic column only)
-            ws.append([
+            yield [
                 "", "", "",
                 row.get("subtopics", ""),
                 ""
-            ])
+            ]
+
+    def _stream_subject_sheet(self, ws, rows: list[dict]):
+        """
+        Write-only equivalent of the regular path: header font, date formats,
+        SELF STUDY separators and unit merges are all applied while the rows are
+        appended, in a single pass.
+        """
+        bold = Font(bold=True)
+        thin = Side(style="thin")
+        border = Border(top=thin, bottom=thin)
 
-            
+        ws.append(self._bold_cells(ws, SUBJECT_HEADERS))
 
-        for col in ["E", "F"]:  # Start Date, End Date
-            for cell in ws[col][1:]:
-                cell.number_format = "yyyy-mm-dd"
+        current_unit = None
+        start_row = None
+        row_idx = 1
+        for values in self._sheet_rows(rows):
+            row_idx += 1
+            values = list(values)
+            for col in (4, 5):  # Start Date, End Date
+                if col < len(values):
+                    cell = WriteOnlyCell(ws, values[col])
+                    cell.number_format = "yyyy-mm-dd"
+                    values[col] = cell
+            if len(values) > 3 and values[3] == "SELF STUDY":
+                cell = WriteOnlyCell(ws, values[3])
+                cell.font = bold
+                cell.border = border
+                values[3] = cell
+            ws.append(values)
+
+            # Same merge rule as _merge_units, tracked on the fly
+            unit = values[0]
+            if unit != current_unit:
+                if current_unit is not None:
+                    self._merge_unit_columns(ws, start_row, row_idx - 1)
+                current_unit = unit
+                start_row = row_idx
 
+        if start_row:
+            self._merge_unit_columns(ws, start_row, row_idx)
 
-        self._apply_unit_separators(ws)
-        self._merge_units(ws)
+    def _bold_cells(self, ws, values: list):
+        cells = []
+        for value in values:
+            cell = WriteOnlyCell(ws, value)
+            cell.font = Font(bold=True)
+            cells.append(cell)
+        return cells
 
+    def _merge_unit_columns(self, ws, start_row: int, end_row: int):
+        # Write-only sheets can't merge cells directly; ranges are written at save time.
+        # They never overlap, so skip MultiCellRange.add's linear containment check.
+        for col in (1, 2, 3):
+            ws.merged_cells.ranges.add(CellRange(min_col=col, max_col=col, min_row=start_row, max_row=end_row))
 
     def _apply_unit_separators(self, ws):
         thin = Side(style="thin")
@@ -128,7 +271,46 @@ class ExcelWriter:
         props.description = "Auto-generated semester planner using Python"
         if "Sheet" in self.wb.sheetnames:
             del self.wb["Sheet"]
-        self.wb.save(path)
+        with timed_stage(self.progress, "excel", "Saving workbook"):
+            self.wb.save(path)
+            if not self._stitched:
+                return
+            try:
+                self._stitch_sheets(path)
+            except Exception as e:
+                logger.warning(f"Stitching worker sheets failed ({e}); rendering the workbook serially.")
+                if os.path.exists(path + ".tmp"):
+                    os.remove(path + ".tmp")
+                self._save_serial(path)
+            finally:
+                shutil.rmtree(self._tmp_dir, ignore_errors=True)
+                self._tmp_dir = None
+                self._stitched = []
+
+    def _save_serial(self, path: str):
+        rows, subjects = self._plan
+        writer = ExcelWriter(progress=self.progress, streaming=self.streaming, workers=1)
+        writer.write_plan(rows, subjects)
+        writer.save(path)
+
+    def _stitch_sheets(self, path: str):
+        """Replaces the placeholder sheets in the saved workbook with the worker-rendered ones."""
+        # Sheet ids (and so part names) are assigned while saving
+        replacements = {ws.path.lstrip("/"): worker_path for ws, worker_path in self._stitched}
+
+        tmp_path = path + ".tmp"
+        with zipfile.ZipFile(path) as zin, zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as zout:
+            styles = zin.read("xl/styles.xml")
+            for item in zin.infolist():
+                worker_path = replacements.get(item.filename)
+                if worker_path is None:
+                    zout.writestr(item, zin.read(item.filename))
+                    continue
+                with zipfile.ZipFile(worker_path) as part:
+                    if part.read("xl/styles.xml") != styles:
+                        raise RuntimeError(f"Sheet rendered in {worker_path} uses different styles; cannot stitch it.")
+                    zout.writestr(item, part.read(WORKER_SHEET_PART))
+        os.replace(tmp_path, path)
 
     def _merge_units(self, ws):
         current_unit = None
@@ -158,7 +340,64 @@ class ExcelWriter:
             ws.merge_cells(start_row=start_row, end_row=ws.max_row,
                         start_column=3, end_column=3)
 
-    def write_master_sheet(self, rows):
+    def write_plan(self, rows: list[dict], subjects=None):
+        """
+        Writes a full plan: the Master summary sheet first, then one sheet per subject
+        in plan order. Rows are grouped and summarized in a single pass.
+        `subjects` (the planned Subject objects) fill the Credits / Mid % / End % columns.
+        """
+        by_subject, summary = partition_by_subject(rows, subjects)
+        self.write_master_sheet(rows, summary=summary)
+        if self.workers > 1 and len(by_subject) > 1:
+            if not openpyxl.__version__.startswith(STITCH_OPENPYXL):
+                logger.warning(f"Parallel sheets need openpyxl {STITCH_OPENPYXL}x "
+                               f"(found {openpyxl.__version__}); rendering serially.")
+            elif self._render_subjects_parallel(by_subject):
+                self._plan = (rows, subjects)
+                return
+        for subject_name, subject_rows in by_subject.items():
+            self.write_subject_sheet(subject_name, subject_rows)
+
+    def _render_subjects_parallel(self, by_subject: dict) -> bool:
+        """
+        Renders each subject's sheet in a worker process. The final workbook gets an
+        empty placeholder sheet per subject; save() swaps in the rendered sheet XML.
+        Returns False, leaving nothing behind, if any worker fails.
+        """
+        self._tmp_dir = tempfile.mkdtemp(prefix="excel_sheets_")
+        names = list(by_subject)
+        paths = [os.path.join(self._tmp_dir, f"{i}.xlsx") for i in range(len(names))]
+
+        workers = min(self.workers, len(names))
+        logger.info(f"Rendering {len(names)} subject sheets with {workers} worker processes.")
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                rendered = pool.map(_render_subject_workbook, names, [by_subject[n] for n in names], paths)
+                # map() yields in submission order; report each sheet as it completes
+                for name, _ in zip(names, rendered):
+                    report(self.progress, "excel", message=f"Rendered sheet '{name}' ({len(by_subject[name])} rows)")
+        except Exception as e:
+            logger.warning(f"Parallel sheet rendering failed ({e}); rendering serially.")
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+            self._tmp_dir = None
+            return False
+
+        # Placeholders only once every sheet exists, so a fallback starts from a clean workbook
+        for name, path in zip(names, paths):
+            self._stitched.append((self.wb.create_sheet(title=name[:31]), path))
+        return True
+
+    def __del__(self):
+        # A writer that rendered sheets but was never saved still owns its temp directory
+        if getattr(self, "_tmp_dir", None):
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+
+    def write_master_sheet(self, rows, summary=None, subjects=None):
+        """
+        `summary` is the summary from partition_by_subject; computed from rows
+        (and the Subject objects in `subjects`) if omitted. Hours that didn't fit
+        their week (capacity scheduling) are listed per subject and per week.
+        """
         ws = self.wb.create_sheet(title="Master")
 
         headers = [
@@ -168,31 +407,21 @@ class ExcelWriter:
             "Credits",
             "Mid %",
             "End %",
-            "Total Weeks"
+            "Total Weeks",
+            "Overflow Hours"
         ]
-        ws.append(headers)
+        if self.streaming:
+            ws.append(self._bold_cells(ws, headers))
+        else:
+            ws.append(headers)
 
-        for cell in ws[1]:
-            cell.font = Font(bold=True)
+            for cell in ws[1]:
+                cell.font = Font(bold=True)
 
-        subjects = {}
+        if summary is None:
+            _, summary = partition_by_subject(rows, subjects)
 
-        for r in rows:
-            subj = r["subject"]
-            subjects.setdefault(subj, {
-                "units": set(),
-                "topics": 0,
-                "weeks": set(),
-                "credits": r.get("credits"),
-                "mid": None,
-                "end": None
-            })
-
-            subjects[subj]["units"].add(r["unit"])
-            subjects[subj]["topics"] += 1
-            subjects[subj]["weeks"].add(r["week"])
-
-        for subj, data in subjects.items():
+        for subj, data in summary.items():
             ws.append([
                 subj,
                 len(data["units"]),
@@ -200,5 +429,15 @@ class ExcelWriter:
                 data["credits"],
                 data["mid"],
                 data["end"],
-                len(data["weeks"])
+                len(data["weeks"]),
+                data["overflow_hours"]
+            ])
+
+        overflow = overflow_summary(rows)
+        if overflow["hours"]:
+            ws.append([])
+            ws.append([
+                "Over capacity",
+                f"{overflow['hours']}h in {overflow['topics']} topics: "
+                + ", ".join(f"week {week} +{hours}h" for week, hours in sorted(overflow["weeks"].items()))
             ])
@@ -0,0 +1,70 @@
+"""
+Output format selection.
+
+Responsibilities:
+- Map format names (xlsx, csv, jsonl, ics) to their writers
+- Parse a requested set of formats from the CLI, API or environment
+- Write one plan in every requested format into a version directory
+
+Each writer is independent; requesting only "csv" never builds a workbook.
+"""
+
+import os
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from planner.writers.csv_writer import CsvWriter
+from planner.writers.excel_writer import ExcelWriter
+from planner.writers.ics_writer import IcsWriter
+from planner.writers.jsonl_writer import JsonlWriter
+
+# Row-streaming writers: Writer(progress).write(rows, path)
+WRITERS = {
+    "csv": CsvWriter,
+    "jsonl": JsonlWriter,
+    "ics": IcsWriter,
+}
+
+OUTPUT_FORMATS = ["xlsx", *WRITERS]
+
+
+def parse_formats(value: Optional[Union[str, Iterable[str]]] = None) -> List[str]:
+    """
+    Accepts "xlsx,csv" or ["xlsx", "csv"] and returns the formats in order, without duplicates.
+    Priority: argument -> OUTPUT_FORMATS environment variable -> xlsx only.
+    """
+    if value is None:
+        value = os.environ.get("OUTPUT_FORMATS", "xlsx")
+    if isinstance(value, str):
+        value = value.split(",")
+
+    formats = []
+    for fmt in value:
+        fmt = fmt.strip().lower().lstrip(".")
+        if not fmt or fmt in formats:
+            continue
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format: {fmt} (choose from {', '.join(OUTPUT_FORMATS)})")
+        formats.append(fmt)
+
+    if not formats:
+        raise ValueError("At least one output format is required")
+    return formats
+
+
+def write_outputs(rows: List[Dict[str, Any]], out_dir: str, formats: List[str],
+                  progress=None, basename: str = "semester_plan", subjects=None) -> Dict[str, str]:
+    """
+    Writes rows in each format to <out_dir>/<basename>.<format>. Returns {format: path}.
+    `subjects` (the planned Subject objects) feed the workbook's Master summary.
+    """
+    paths = {}
+    for fmt in formats:
+        path = os.path.join(out_dir, f"{basename}.{fmt}")
+        if fmt == "xlsx":
+            writer = ExcelWriter(progress=progress)
+            writer.write_plan(rows, subjects)
+            writer.save(path)
+        else:
+            WRITERS[fmt](progress=progress).write(rows, path)
+        paths[fmt] = path
+    return paths
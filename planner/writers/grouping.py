@@ -0,0 +1,71 @@
+"""
+Plan-to-output grouping.
+
+Responsibilities:
+- Partition planning rows by subject in a single pass
+- Collect the per-subject master summary in that same pass, with credits and
+  exam weightage taken from the Subject objects
+- Keep plan order: subjects in order of first appearance, rows in plan order
+
+Writers consume the result; no formatting lives here.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from planner.engine.planner_engine import REVISION_SUBJECT
+from planner.models.syllabus import Subject
+
+
+def _exam_split(exam_weightage: dict) -> Tuple[Optional[Any], Optional[Any]]:
+    """(mid %, end %) from weightages like {"mid": 30, "end": 70} or {"midterm": 30, "final": 70}."""
+    mid = end = None
+    for component, value in (exam_weightage or {}).items():
+        name = str(component).lower()
+        if mid is None and name.startswith("mid"):
+            mid = value
+        elif end is None and name.startswith(("end", "final")):
+            end = value
+    return mid, end
+
+
+def partition_by_subject(rows: List[Dict[str, Any]], subjects: Optional[List[Subject]] = None
+                         ) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, Dict[str, Any]]]:
+    """
+    Returns (rows_by_subject, summary). Both dicts are keyed by subject name in
+    order of first appearance. The summary holds what ExcelWriter.write_master_sheet
+    needs: units, topics, weeks, credits, mid, end, overflow_hours. Credits and exam split come from
+    `subjects` (left empty without them); the revision rows get no summary entry.
+    """
+    by_subject: Dict[str, List[Dict[str, Any]]] = {}
+    summary: Dict[str, Dict[str, Any]] = {}
+    by_name = {s.name: s for s in subjects or []}
+
+    for r in rows:
+        subj = r["subject"]
+        subject_rows = by_subject.get(subj)
+        if subject_rows is None:
+            subject_rows = by_subject[subj] = []
+            if subj != REVISION_SUBJECT:
+                subject = by_name.get(subj)
+                mid, end = _exam_split(subject.exam_weightage) if subject else (None, None)
+                summary[subj] = {
+                    "units": set(),
+                    "topics": 0,
+                    "weeks": set(),
+                    "credits": subject.credits if subject else None,
+                    "mid": mid,
+                    "end": end,
+                    "overflow_hours": 0
+                }
+        subject_rows.append(r)
+
+        data = summary.get(subj)
+        if data is None:
+            continue
+        data["units"].add(r["unit"])
+        data["topics"] += 1
+        data["weeks"].add(r["week"])
+        if r.get("overflow_hours"):
+            data["overflow_hours"] = round(data["overflow_hours"] + r["overflow_hours"], 1)
+
+    return by_subject, summary
@@ -0,0 +1,106 @@
+"""
+iCalendar (.ics) output generation.
+
+Responsibilities:
+- Stream planning rows as all-day VEVENTs spanning each row's week
+- Give every event a UID that stays stable across re-plans, so calendar
+  sync updates moved topics instead of duplicating them
+- Follow RFC 5545 text escaping and line folding
+"""
+
+import hashlib
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable
+
+from planner.utils.progress import timed_stage
+
+
+def _escape(text: str) -> str:
+    return (
+        str(text)
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line: str) -> str:
+    """Splits content lines longer than 75 octets, continuing with a leading space."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line
+    parts = []
+    while encoded:
+        limit = 75 if not parts else 74
+        cut = min(limit, len(encoded))
+        # Don't split a multi-byte character
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode("utf-8"))
+        encoded = encoded[cut:]
+    return "\r\n ".join(parts)
+
+
+def _as_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value), "%Y-%m-%d").date()
+
+
+class IcsWriter:
+
+    def __init__(self, progress=None, calendar_name: str = "Semester Study Plan"):
+        self.progress = progress
+        self.calendar_name = calendar_name
+
+    def write(self, rows: Iterable[Dict[str, Any]], path: str):
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        seen: Dict[str, int] = {}
+
+        with timed_stage(self.progress, "ics", "Writing calendar"):
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                def emit(line: str):
+                    f.write(_fold(line))
+                    f.write("\r\n")
+
+                emit("BEGIN:VCALENDAR")
+                emit("VERSION:2.0")
+                emit("PRODID:-//Semester Planner//Study Plan//EN")
+                emit("CALSCALE:GREGORIAN")
+                emit(f"X-WR-CALNAME:{_escape(self.calendar_name)}")
+
+                for row in rows:
+                    subtopics = row.get("subtopics") or ""
+                    if isinstance(subtopics, list):
+                        subtopics = ", ".join(subtopics)
+
+                    # Identity of the topic, not of its slot, so a moved topic keeps its UID
+                    identity = f"{row['subject']}|{row['unit']}|{row['topic']}|{subtopics}"
+                    occurrence = seen.get(identity, 0)
+                    seen[identity] = occurrence + 1
+                    uid = hashlib.sha1(f"{identity}|{occurrence}".encode("utf-8")).hexdigest()
+
+                    start = _as_date(row["start_date"])
+                    end = _as_date(row["end_date"]) + timedelta(days=1)  # DTEND is exclusive
+
+                    summary = f"{row['subject']}: {row['topic']}"
+                    details = [f"Unit {row['unit']}: {row.get('unit_title', '')}", f"Week {row['week']}"]
+                    if row.get("estimated_hours"):
+                        details.append(f"Estimated hours: {row['estimated_hours']}")
+                    if subtopics:
+                        details.append(f"Subtopics: {subtopics}")
+
+                    emit("BEGIN:VEVENT")
+                    emit(f"UID:{uid}@semester-planner")
+                    emit(f"DTSTAMP:{stamp}")
+                    emit(f"DTSTART;VALUE=DATE:{start.strftime('%Y%m%d')}")
+                    emit(f"DTEND;VALUE=DATE:{end.strftime('%Y%m%d')}")
+                    emit(f"SUMMARY:{_escape(summary)}")
+                    emit(f"DESCRIPTION:{_escape(chr(10).join(details))}")
+                    emit("TRANSP:TRANSPARENT")
+                    emit("END:VEVENT")
+
+                emit("END:VCALENDAR")
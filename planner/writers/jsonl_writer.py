@@ -0,0 +1,25 @@
+"""
+JSON Lines output generation.
+
+Responsibilities:
+- Stream planning rows as one JSON object per line
+- Serialize dates as ISO strings (YYYY-MM-DD)
+"""
+
+import json
+from typing import Any, Dict, Iterable
+
+from planner.utils.progress import timed_stage
+
+
+class JsonlWriter:
+
+    def __init__(self, progress=None):
+        self.progress = progress
+
+    def write(self, rows: Iterable[Dict[str, Any]], path: str):
+        with timed_stage(self.progress, "jsonl", "Writing JSON Lines"):
+            with open(path, "w", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row, default=str))
+                    f.write("\n")
@@ -3,26 +3,132 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+import asyncio
+import functools
 import json
+import multiprocessing
+import queue
 import uuid
 import shutil
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 
 from planner.utils.logger import setup_logger
+from planner.utils.jobs import Job, JobManager, QueueFullError
+from planner.utils.progress import QueueReporter
+from planner.utils.sessions import create_session_store
 
 logger = setup_logger(__name__)
 
-from planner.ingestion.ocr import OCREngine
-from planner.ingestion.cleaner import SyllabusCleaner
-from planner.ai.extractor import Syllabusextractor
+from planner.ai.cache import get_default_cache
+from planner.ai.clients import get_client_registry
+from planner.ai.extractor import Syllabusextractor, route_stats
+from planner.ai.resilience import LLMUnavailableError
 from planner.ai.validator import SyllabusValidator
 from planner.agent.dialogue import DialogueAgent
-from main import load_subjects_from_dict, get_next_version_dir, Subject, PlannerEngine, ExcelWriter
+from planner.engine.planner_engine import scheduling_mode
+from planner.writers.formats import OUTPUT_FORMATS, parse_formats
+from main import ingest_text, generate_outputs
 
-app = FastAPI()
+# CPU-bound stages (OCR, cleaning, planning, Excel) run in worker processes and
+# I/O-bound stages (uploads, Gemini calls) in threads, so the event loop never blocks.
+cpu_pool: Optional[ProcessPoolExecutor] = None
+io_pool: Optional[ThreadPoolExecutor] = None
+# Owns the queues that carry progress events out of worker processes
+progress_manager = None
+# OCR processes per cpu_pool worker; each worker's OCREngine starts its own pool
+ocr_workers = 1
+
+# Background jobs for /jobs/* endpoints; bounded so exam-season peaks get a 503 instead of a pile-up
+jobs = JobManager(
+    workers=int(os.environ.get("JOB_WORKERS", 2)),
+    max_queued=int(os.environ.get("JOB_QUEUE_SIZE", 20)),
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global cpu_pool, io_pool, progress_manager, ocr_workers
+    cpus = os.cpu_count() or 1
+    cpu_workers = max(1, int(os.environ.get("API_CPU_WORKERS", cpus)))
+    # One CPU budget for both levels: N concurrent uploads x OCR pool must not become N x CPU count
+    # Priority: environment -> CPU count split across the API workers
+    ocr_workers = max(1, int(os.environ.get("OCR_WORKERS", cpus // cpu_workers)))
+    cpu_pool = ProcessPoolExecutor(max_workers=cpu_workers)
+    io_pool = ThreadPoolExecutor(max_workers=int(os.environ.get("API_IO_WORKERS", 8)))
+    progress_manager = multiprocessing.Manager()
+    if os.environ.get("LLM_WARMUP", "true").lower() in ("1", "true", "yes"):
+        # Configure Gemini before the first upload instead of during it
+        await run_in_pool(io_pool, get_client_registry().warm_up)
+    await jobs.start()
+    sweeper = asyncio.create_task(_sweep_sessions())
+    yield
+    sweeper.cancel()
+    await jobs.stop()
+    cpu_pool.shutdown(cancel_futures=True)
+    io_pool.shutdown(cancel_futures=True)
+    progress_manager.shutdown()
+
+async def _sweep_sessions():
+    """Expires idle sessions even when no requests come in to trigger eviction."""
+    interval = float(os.environ.get("SESSION_SWEEP_SECONDS", 60))
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_pool(io_pool, sessions.purge_expired)
+        except Exception:
+            logger.exception("Session sweep failed")
+
+async def run_in_pool(pool, fn, *args):
+    """Awaits fn(*args) on the given executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(pool, functools.partial(fn, *args))
+
+def _save_upload(src, file_path: str):
+    with open(file_path, "wb") as buffer:
+        shutil.copyfileobj(src, buffer)
+
+def _extract_syllabus(clean_text: str, progress=None) -> Dict[str, Any]:
+    return Syllabusextractor(progress=progress).extract(clean_text)
+
+@asynccontextmanager
+async def job_progress(job: Optional[Job]):
+    """
+    Yields a picklable progress callback whose events end up in job.events.
+    Yields None when there is no job to report to.
+    """
+    if job is None:
+        yield None
+        return
+
+    events = progress_manager.Queue()
+
+    def drain():
+        while True:
+            try:
+                job.add_event(events.get_nowait())
+            except queue.Empty:
+                return
+
+    async def pump():
+        while True:
+            drain()
+            await asyncio.sleep(0.1)
+
+    task = asyncio.create_task(pump())
+    job.flush_events = drain
+    try:
+        yield QueueReporter(events)
+    finally:
+        task.cancel()
+        drain()
+        job.flush_events = None
+
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS for local development
 app.add_middleware(
@@ -32,62 +138,96 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory session storage (simple for local use)
-sessions: Dict[str, Any] = {}
+def _remove_session_files(session_id: str, session: Optional[Dict[str, Any]] = None):
+    """Deletes temp/<session_id>/ once its session is evicted or the upload failed."""
+    shutil.rmtree(os.path.join("temp", session_id), ignore_errors=True)
+
+# Bounded session storage (SESSION_BACKEND=memory|sqlite); evicted sessions lose their temp files
+sessions = create_session_store(on_evict=_remove_session_files)
 
 class ClarificationResponse(BaseModel):
     session_id: str
     answers: Dict[str, str]
+    # Output files to produce, e.g. ["xlsx", "ics"]; defaults to OUTPUT_FORMATS / xlsx
+    formats: Optional[List[str]] = None
+    # "count" or "capacity"; defaults to the semester config, then PLAN_SCHEDULING / count
+    scheduling: Optional[str] = None
 
 @app.get("/")
 async def health_check():
     return {"status": "online", "message": "Semester Planner API is active"}
 
-@app.post("/upload")
-async def upload_syllabus(file: UploadFile = File(...)):
-    logger.info(f"Received upload request for file: {file.filename}")
+@app.get("/llm/health")
+async def llm_health():
+    """Gemini client state, call statistics, fast-path share and extraction cache usage."""
+    return {
+        **get_client_registry().health(),
+        "routes": route_stats(),
+        "cache": get_default_cache().stats(),
+    }
+
+async def _save_to_session_dir(file: UploadFile):
+    """Stores an uploaded file under temp/<session_id>/ and returns (session_id, file_path)."""
     session_id = str(uuid.uuid4())
     temp_dir = f"temp/{session_id}"
     os.makedirs(temp_dir, exist_ok=True)
     
     file_path = os.path.join(temp_dir, file.filename)
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    await run_in_pool(io_pool, _save_upload, file.file, file_path)
+    return session_id, file_path
+
+async def process_upload(session_id: str, file_path: str, job: Optional[Job] = None) -> Dict[str, Any]:
+    """Runs ingestion, extraction and validation for a saved upload and opens its session."""
+    async with job_progress(job) as progress:
+        # 1. Ingestion
+        if job:
+            job.set_stage("ingestion")
+        clean_text = await run_in_pool(cpu_pool, ingest_text, file_path, progress, ocr_workers)
+
+        if job:
+            job.set_stage("extraction")
+        syllabus_data = await run_in_pool(io_pool, _extract_syllabus, clean_text, progress)
+    
+    # 2. Validation
+    if job:
+        job.set_stage("validation")
+    validator = SyllabusValidator()
+    clarifications = validator.validate(syllabus_data)
     
-    # 1. Ingestion
+    # Session stores may block (SQLite, evictions deleting temp files); keep them off the loop
+    await run_in_pool(io_pool, sessions.set, session_id, {
+        "syllabus_data": syllabus_data,
+        "clarifications": clarifications,
+        "file_path": file_path
+    })
+    
+    return {
+        "session_id": session_id,
+        "clarifications": clarifications,
+        "syllabus_data": syllabus_data
+    }
+
+def _requested_formats(response: "ClarificationResponse") -> List[str]:
     try:
-        ocr = OCREngine()
-        cleaner = SyllabusCleaner()
-        extractor = Syllabusextractor()
-        
-        raw_text = ocr.extract_text(file_path)
-        clean_text = cleaner.clean(raw_text)
-        syllabus_data = extractor.extract(clean_text)
-        
-        # 2. Validation
-        validator = SyllabusValidator()
-        clarifications = validator.validate(syllabus_data)
-        
-        sessions[session_id] = {
-            "syllabus_data": syllabus_data,
-            "clarifications": clarifications,
-            "file_path": file_path
-        }
-        
-        return {
-            "session_id": session_id,
-            "clarifications": clarifications,
-            "syllabus_data": syllabus_data
-        }
-    except Exception as e:
-        logger.exception("Error during syllabus upload/processing")
-        raise HTTPException(status_code=500, detail=str(e))
+        return parse_formats(response.formats)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-@app.post("/refine")
-async def refine_plan(response: ClarificationResponse):
-    session = sessions.get(response.session_id)
+def _requested_scheduling(response: "ClarificationResponse") -> Optional[str]:
+    if response.scheduling is None:
+        return None
+    try:
+        return scheduling_mode({}, response.scheduling)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def process_refine(response: "ClarificationResponse", job: Optional[Job] = None) -> Dict[str, Any]:
+    """Applies clarification answers to a session and generates a new plan version."""
+    session = await run_in_pool(io_pool, sessions.get, response.session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
+    formats = _requested_formats(response)
+    scheduling = _requested_scheduling(response)
     
     syllabus_data = session["syllabus_data"]
     answers = response.answers
@@ -115,42 +255,127 @@ async def refine_plan(response: ClarificationResponse):
     syllabus_data["difficulty_multiplier"] = 1.3 if answers.get("difficulty") == "yes" else 1.0
     syllabus_data["revision_weeks"] = 2 if answers.get("revision") == "yes" else 0
 
-    # 3. Generate Plan
-    subjects, semester_config = load_subjects_from_dict(syllabus_data)
-    engine = PlannerEngine(subjects, semester_config)
-    rows = engine.generate_plan_with_time()
-    
-    # 4. Save
-    version_dir = get_next_version_dir()
-    os.makedirs(version_dir, exist_ok=True)
-    
-    with open(os.path.join(version_dir, "syllabus_refined.json"), 'w') as f:
-        json.dump(syllabus_data, f, indent=2)
-
-    writer = ExcelWriter()
-    for subject_name in set(r["subject"] for r in rows):
-        writer.write_subject_sheet(
-            subject_name,
-            [r for r in rows if r["subject"] == subject_name]
+    # 3. Generate Plan + Save
+    if job:
+        job.set_stage("planning")
+    async with job_progress(job) as progress:
+        version_dir, out_files, overflow = await run_in_pool(
+            cpu_pool, generate_outputs, syllabus_data, progress, formats, scheduling
         )
 
-    out_file = os.path.join(version_dir, "semester_plan.xlsx")
-    writer.save(out_file)
+    # Persist the applied answers (stores hand out copies, e.g. the SQLite backend)
+    await run_in_pool(io_pool, sessions.set, response.session_id, session)
     
     return {
         "status": "success",
         "version": os.path.basename(version_dir),
-        "excel_path": out_file
+        "excel_path": out_files.get("xlsx"),
+        "outputs": out_files,
+        # Capacity scheduling: hours that didn't fit their week ({"weeks", "topics", "hours"})
+        "overflow": overflow
     }
 
+@app.post("/upload")
+async def upload_syllabus(file: UploadFile = File(...)):
+    logger.info(f"Received upload request for file: {file.filename}")
+    session_id, file_path = await _save_to_session_dir(file)
+    
+    try:
+        return await process_upload(session_id, file_path)
+    except LLMUnavailableError as e:
+        await run_in_pool(io_pool, _remove_session_files, session_id)
+        raise HTTPException(status_code=503, detail=str(e),
+                            headers={"Retry-After": str(max(1, round(e.retry_after)))})
+    except Exception as e:
+        logger.exception("Error during syllabus upload/processing")
+        await run_in_pool(io_pool, _remove_session_files, session_id)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/refine")
+async def refine_plan(response: ClarificationResponse):
+    return await process_refine(response)
+
+def _submit_job(kind: str, fn) -> JSONResponse:
+    try:
+        job = jobs.submit(kind, fn)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job.id, "status": job.status, "status_url": f"/jobs/{job.id}"},
+    )
+
+@app.post("/jobs/upload")
+async def submit_upload_job(file: UploadFile = File(...)):
+    logger.info(f"Received upload job for file: {file.filename}")
+    session_id, file_path = await _save_to_session_dir(file)
+    async def run(job: Job):
+        try:
+            return await process_upload(session_id, file_path, job)
+        except Exception:
+            await run_in_pool(io_pool, _remove_session_files, session_id)
+            raise
+
+    try:
+        return _submit_job("upload", run)
+    except HTTPException:
+        await run_in_pool(io_pool, _remove_session_files, session_id)
+        raise
+
+@app.post("/jobs/refine")
+async def submit_refine_job(response: ClarificationResponse):
+    if not await run_in_pool(io_pool, sessions.__contains__, response.session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    _requested_formats(response)
+    _requested_scheduling(response)
+    return _submit_job("refine", lambda job: process_refine(response, job))
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """
+    Server-sent events: one `progress` event per pipeline event (stage, page N of M,
+    timings), then a final `end` event carrying the job status and result.
+    """
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        sent = 0
+        while True:
+            finished = job.finished
+            while sent < len(job.events):
+                yield f"event: progress\ndata: {json.dumps(job.events[sent], default=str)}\n\n"
+                sent += 1
+            if finished:
+                yield f"event: end\ndata: {json.dumps(job.to_dict(), default=str)}\n\n"
+                return
+            await asyncio.sleep(0.2)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 from fastapi.responses import FileResponse
 
 @app.get("/download/{version}")
-async def download_plan(version: str):
-    file_path = f"output/{version}/semester_plan.xlsx"
+async def download_plan(version: str, format: str = "xlsx"):
+    if format not in OUTPUT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    output_dir = os.environ.get("OUTPUT_DIR", "output")
+    file_path = os.path.join(output_dir, os.path.basename(version), f"semester_plan.{format}")
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(file_path, filename=f"semester_plan_{version}.xlsx")
+    return FileResponse(file_path, filename=f"semester_plan_{version}.{format}")
 
 if __name__ == "__main__":
     import uvicorn
@@ -20,6 +20,39 @@ export default function App() {
   const [currentClarificationIdx, setCurrentClarificationIdx] = useState(0);
   const [result, setResult] = useState(null);
   const [error, setError] = useState("");
+  const [progress, setProgress] = useState(null);
+
+  // Submits the upload as a background job and follows its server-sent progress events
+  const runUploadJob = async (formData) => {
+    const submit = await axios.post(`${API_BASE}/jobs/upload`, formData);
+
+    return new Promise((resolve, reject) => {
+      const events = new EventSource(`${API_BASE}/jobs/${submit.data.job_id}/events`);
+
+      events.addEventListener("progress", (e) => {
+        const evt = JSON.parse(e.data);
+        setProgress({
+          stage: evt.stage,
+          message: evt.message || `${evt.stage} ${evt.event}`,
+          current: evt.current,
+          total: evt.total,
+          elapsed: evt.elapsed,
+        });
+      });
+
+      events.addEventListener("end", (e) => {
+        events.close();
+        const job = JSON.parse(e.data);
+        if (job.status === "done") resolve(job.result);
+        else reject(new Error(job.error || "Failed to process syllabus."));
+      });
+
+      events.onerror = () => {
+        events.close();
+        reject(new Error("Lost connection to the server."));
+      };
+    });
+  };
 
   const handleFileUpload = async (e) => {
     const uploadedFile = e.target.files[0];
@@ -28,17 +61,18 @@ export default function App() {
     setFile(uploadedFile);
     setLoading(true);
     setError("");
+    setProgress(null);
 
     const formData = new FormData();
     formData.append("file", uploadedFile);
 
     try {
-      const resp = await axios.post(`${API_BASE}/upload`, formData);
-      setSessionId(resp.data.session_id);
+      const data = await runUploadJob(formData);
+      setSessionId(data.session_id);
 
       // Merge AI clarifications with general preferences
       const tasks = [
-        ...resp.data.clarifications,
+        ...data.clarifications,
         { field: "difficulty", question: "Is this subject difficult? (yes/no)" },
         { field: "revision", question: "Do you want dedicated revision weeks? (yes/no)" }
       ];
@@ -46,9 +80,10 @@ export default function App() {
       setClarifications(tasks);
       setStep(2);
     } catch (err) {
-      setError(err.response?.data?.detail || "Failed to process syllabus.");
+      setError(err.response?.data?.detail || err.message || "Failed to process syllabus.");
     } finally {
       setLoading(false);
+      setProgress(null);
     }
   };
 
@@ -134,7 +169,17 @@ export default function App() {
             {loading && (
               <div className="flex flex-col items-center gap-4 py-4 animate-in fade-in transition-all">
                 <Loader2 className="w-8 h-8 text-primary-500 animate-spin" />
-                <p className="text-slate-400 animate-pulse text-sm">Analyzing syllabus content via OCR & AI...</p>
+                <p className="text-slate-400 animate-pulse text-sm">
+                  {progress ? progress.message : "Analyzing syllabus content via OCR & AI..."}
+                </p>
+                {progress?.total > 0 && (
+                  <div className="w-64 h-1.5 bg-slate-800 rounded-full overflow-hidden">
+                    <div
+                      className="h-full bg-primary-500 transition-all"
+                      style={{ width: `${Math.round((progress.current / progress.total) * 100)}%` }}
+                    />
+                  </div>
+                )}
               </div>
             )}
           </div>